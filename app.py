@@ -1,9 +1,61 @@
 # app.py
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
-from bazi_calculator import calculate_bazi
+import hashlib
+import os
+from contextlib import asynccontextmanager
+from datetime import datetime
+from functools import partial
+from typing import Dict, List, Literal, Optional
 
-app = FastAPI(title="BaZi Five Elements Analyzer API with Pillars and Percentages")
+from fastapi import FastAPI, Header, HTTPException, Query, Request
+from fastapi.responses import Response, StreamingResponse
+from pydantic import BaseModel, Field
+from starlette.concurrency import run_in_threadpool
+from bazi_calculator import CHART_ALGORITHM_VERSION, DEFAULT_CALCULATOR, calculate_bazi
+from bazi_executor import ChartExecutor, ExecutorOverloaded
+from chart_formats import (ARROW_STREAM, MSGPACK, ArrowStreamResponse, MsgpackResponse, available_media_types,
+                           negotiate)
+from fast_json import FastJSONResponse, dumps
+from name_analyzer import NameAnalyzer, load_character_dictionary
+
+KXZD_CSV_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "kxzd.csv")
+
+name_analyzer = NameAnalyzer()
+
+# Where /bazi charts run (inline, thread pool or process pool) and how many may be pending;
+# configured through BAZI_EXECUTOR* environment variables, see bazi_executor.py
+chart_executor = ChartExecutor.from_env()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Build the character index once per worker process, before the first request, and
+    # pick up the precomputed name catalog if the build produced one
+    load_character_dictionary(KXZD_CSV_PATH)
+    name_analyzer.load_catalog()
+    await chart_executor.start()
+    yield
+    await chart_executor.shutdown()
+
+app = FastAPI(title="BaZi Five Elements Analyzer API with Pillars and Percentages", lifespan=lifespan)
+
+# Upper bound on items per /bazi/batch call, so a single request cannot tie up a worker indefinitely
+MAX_BATCH_SIZE = 10000
+
+# Largest page of name combinations per /names call
+MAX_NAMES_PAGE_SIZE = 500
+
+# ?profile= on the chart endpoints: "pillars", "scores" or "full" (bazi_calculator.PROFILES)
+ChartProfile = Literal["pillars", "scores", "full"]
+PROFILE_QUERY = Query("full", description="pillars: the four pillars only; scores: plus five_elements_scores; full: plus the analysis")
+
+# Cache-Control of GET /bazi: a chart for given inputs only changes with CHART_ALGORITHM_VERSION,
+# which is not part of the URL, only of the ETag. Cached copies are therefore reused for a day
+# and then revalidated with If-None-Match (304 while the version is unchanged), so a version
+# bump reaches every cache within CHART_MAX_AGE_SECONDS.
+CHART_MAX_AGE_SECONDS = 86400
+CHART_CACHE_CONTROL = f"public, max-age={CHART_MAX_AGE_SECONDS}"
+
+# Longest single NDJSON record accepted by /bazi/stream; bounds the carry-over buffer between body chunks
+MAX_NDJSON_LINE_BYTES = 64 * 1024
 
 class BaziRequest(BaseModel):
     birth_year: int
@@ -12,20 +64,358 @@ class BaziRequest(BaseModel):
     birth_hour: int
     birth_minute: int
 
+class BaziBatchItem(BaziRequest):
+    longitude: float = 103.8
+    tz_offset: Optional[float] = 8.0
+
+class BaziBatchRequest(BaseModel):
+    items: List[BaziBatchItem] = Field(..., max_length=MAX_BATCH_SIZE)
+
+class NameRequest(BaziBatchItem):
+    surname: str
+    # Restricts the search to names whose characters are all of this element; must be one
+    # of the chart's weak elements
+    desired_element: Optional[Literal["木", "火", "土", "金", "水"]] = None
+    cursor: Optional[str] = None
+    limit: int = Field(50, ge=1, le=MAX_NAMES_PAGE_SIZE)
+
+# ------------------------------
+# Chart response models
+#   Describe the chart endpoints' output in the OpenAPI schema. The handlers return
+#   FastJSONResponse directly, so results are not validated against these models or
+#   walked by jsonable_encoder at request time. Fields after five_elements_scores are
+#   only present with profile=full, five_elements_scores only with scores or full.
+# ------------------------------
+class PillarsOut(BaseModel):
+    year_pillar: str
+    month_pillar: str
+    day_pillar: str
+    hour_pillar: str
+    adjusted_to_true_solar_time: str
+    longitude: float
+    tz_offset: float
+
+class ClassificationOut(BaseModel):
+    percentages: Dict[str, float]
+    dominant: str
+    weakest: str
+    summary: str
+
+class RankedElementOut(BaseModel):
+    element: str
+    score: int
+    percentage: float
+
+class ElementInterpretationOut(BaseModel):
+    element: str
+    english_name: str
+    traits: str
+    advice: str
+
+class InterpretationOut(BaseModel):
+    dominant_element: ElementInterpretationOut
+    weakest_element: ElementInterpretationOut
+
+class ChartOut(BaseModel):
+    bazi: PillarsOut
+    five_elements_scores: Optional[Dict[str, int]] = None
+    classification: Optional[ClassificationOut] = None
+    ranked_elements: Optional[List[RankedElementOut]] = None
+    weak_elements: Optional[List[str]] = None
+    balance_strategies: Optional[List[str]] = None
+    interpretation: Optional[InterpretationOut] = None
+
+class BatchResultOut(BaseModel):
+    index: int
+    result: Optional[ChartOut] = None
+    error: Optional[str] = None
+
+class BatchOut(BaseModel):
+    count: int
+    results: List[BatchResultOut]
+
 @app.get("/")
 def root():
     return {"message": "BaZi API is active and ready."}
 
-@app.post("/bazi")
-def bazi_endpoint(req: BaziRequest):
+@app.get("/bazi/cache")
+def bazi_cache_stats():
+    # Hit/miss counters of this process's shared caches, for sizing CHART_CACHE_MAXSIZE /
+    # DAY_PILLAR_CACHE_MAXSIZE. /bazi/batch, /bazi/stream and /names always chart here; /bazi
+    # only when BAZI_EXECUTOR is not "process" (process workers keep their own caches, which
+    # are not included: includes_bazi is then false)
+    return {
+        "executor_backend": chart_executor.backend,
+        "includes_bazi": chart_executor.backend != "process",
+        "charts": DEFAULT_CALCULATOR.cache.stats(),
+        "day_pillars": DEFAULT_CALCULATOR.day_cache.stats()
+    }
+
+# ------------------------------
+# Output format negotiation
+#   /bazi and /bazi/batch answer in JSON, MessagePack or an Arrow IPC stream depending
+#   on the Accept header (see chart_formats.py); 406 when none of the accepted types
+#   can be produced. rows is the batch's {"index", "result"/"error"} list, the input
+#   for the columnar Arrow output.
+# ------------------------------
+CHART_RESPONSES = {
+    200: {"content": {MSGPACK: {}, ARROW_STREAM: {}}},
+    406: {"description": "None of the media types in Accept can be produced"},
+}
+
+def _negotiate_chart_format(accept):
+    media_type = negotiate(accept)
+    if media_type is None:
+        raise HTTPException(status_code=406, detail=f"Supported media types: {', '.join(available_media_types())}")
+    return media_type
+
+def _chart_format_response(media_type, content, rows):
+    if media_type == MSGPACK:
+        return MsgpackResponse(content)
+    if media_type == ARROW_STREAM:
+        return ArrowStreamResponse(rows)
+    return FastJSONResponse(content)
+
+async def _chart_response(media_type, profile, *args):
+    try:
+        result = await chart_executor.run(partial(calculate_bazi, profile=profile), *args)
+        return _chart_format_response(media_type, result, [{"index": 0, "result": result}])
+    except ExecutorOverloaded as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(chart_executor.retry_after)})
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/bazi", response_model=ChartOut, response_class=FastJSONResponse, responses=CHART_RESPONSES)
+async def bazi_endpoint(req: BaziRequest, profile: ChartProfile = PROFILE_QUERY, accept: Optional[str] = Header(None)):
+    media_type = _negotiate_chart_format(accept)
+    return await _chart_response(
+        media_type,
+        profile,
+        req.birth_year,
+        req.birth_month,
+        req.birth_day,
+        req.birth_hour,
+        req.birth_minute,
+    )
+
+# ------------------------------
+# Cacheable chart lookup
+#   GET /bazi?birth_year=...&birth_minute=...[&longitude=&tz_offset=&profile=]
+#   A chart is fully determined by its inputs, the profile, the output format and
+#   CHART_ALGORITHM_VERSION, so the strong ETag is a hash of exactly those and is known
+#   before anything is computed: a matching If-None-Match is answered 304 straight away.
+#   Successful responses carry a one-day public Cache-Control (see CHART_CACHE_CONTROL)
+#   for CDNs and proxies; Vary: Accept keeps the JSON / MessagePack / Arrow
+#   representations apart.
+# ------------------------------
+def chart_etag(req: BaziBatchItem, profile, media_type):
+    key = "|".join([
+        CHART_ALGORITHM_VERSION,
+        f"{req.birth_year}-{req.birth_month}-{req.birth_day} {req.birth_hour}:{req.birth_minute}",
+        repr(req.longitude),
+        repr(req.tz_offset),
+        profile,
+        media_type,
+    ])
+    return '"' + hashlib.sha256(key.encode("utf-8")).hexdigest()[:32] + '"'
+
+def _etag_matches(if_none_match, etag):
+    # If-None-Match uses the weak comparison: W/"x" matches "x"
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+@app.get(
+    "/bazi",
+    response_model=ChartOut,
+    response_class=FastJSONResponse,
+    responses={**CHART_RESPONSES, 304: {"description": "Not modified (If-None-Match matched the ETag)"}},
+)
+async def bazi_get_endpoint(
+    birth_year: int,
+    birth_month: int,
+    birth_day: int,
+    birth_hour: int,
+    birth_minute: int,
+    longitude: float = Query(103.8, allow_inf_nan=False),
+    tz_offset: Optional[float] = Query(8.0, allow_inf_nan=False),
+    profile: ChartProfile = PROFILE_QUERY,
+    accept: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None),
+):
+    req = BaziBatchItem(birth_year=birth_year, birth_month=birth_month, birth_day=birth_day, birth_hour=birth_hour,
+                        birth_minute=birth_minute, longitude=longitude, tz_offset=tz_offset)
+    # Reject an impossible date (like NaN coordinates, a 422 from the query validation)
+    # before If-None-Match, so an invalid request never gets a 304 and cache headers
     try:
-        result = calculate_bazi(
+        datetime(birth_year, birth_month, birth_day, birth_hour, birth_minute)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    media_type = _negotiate_chart_format(accept)
+    etag = chart_etag(req, profile, media_type)
+    headers = {"ETag": etag, "Cache-Control": CHART_CACHE_CONTROL, "Vary": "Accept"}
+    if _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+
+    response = await _chart_response(
+        media_type,
+        profile,
+        req.birth_year,
+        req.birth_month,
+        req.birth_day,
+        req.birth_hour,
+        req.birth_minute,
+        req.longitude,
+        req.tz_offset,
+    )
+    response.headers.update(headers)
+    return response
+
+# ------------------------------
+# Batch charting
+#   Results are returned in input order. A failing item (e.g. an invalid date)
+#   yields {"index", "error"} in its slot instead of failing the whole batch.
+# ------------------------------
+@app.post("/bazi/batch", response_model=BatchOut, response_class=FastJSONResponse, responses=CHART_RESPONSES)
+def bazi_batch_endpoint(req: BaziBatchRequest, profile: ChartProfile = PROFILE_QUERY, accept: Optional[str] = Header(None)):
+    media_type = _negotiate_chart_format(accept)
+    results = []
+    for index, item in enumerate(req.items):
+        try:
+            result = calculate_bazi(
+                item.birth_year,
+                item.birth_month,
+                item.birth_day,
+                item.birth_hour,
+                item.birth_minute,
+                item.longitude,
+                item.tz_offset,
+                profile,
+            )
+            results.append({"index": index, "result": result})
+        except Exception as e:
+            results.append({"index": index, "error": str(e)})
+    return _chart_format_response(media_type, {"count": len(results), "results": results}, results)
+
+# ------------------------------
+# Streaming NDJSON charting
+#   The request body is read chunk by chunk; only complete lines from the current
+#   chunk (plus one partial line carried over) are held at a time. Each chunk's
+#   records are charted in the threadpool and written out before the next chunk
+#   is read, so memory stays flat regardless of the number of lines.
+#   Output lines are {"line": n, "result": ...} or {"line": n, "error": "..."},
+#   with n the 1-based input line number (blank lines are skipped). A line longer
+#   than MAX_NDJSON_LINE_BYTES gets a "line too long" error record whether it arrived
+#   whole or split across chunks; in the latter case the rest of it is discarded up
+#   to the next newline without being buffered, and the stream carries on.
+# ------------------------------
+class _RequestBodyStreamingResponse(StreamingResponse):
+    # The body generator itself consumes receive() via request.stream(), which already
+    # surfaces client disconnects. StreamingResponse's own disconnect listener (used for
+    # ASGI spec < 2.4) would compete for those messages and swallow the request body.
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+
+def _chart_ndjson_lines(lines, first_line_no, profile="full"):
+    out = []
+    for offset, raw in enumerate(lines):
+        line_no = first_line_no + offset
+        if not raw.strip():
+            continue
+        if len(raw) > MAX_NDJSON_LINE_BYTES:
+            out.append(dumps({"line": line_no, "error": "line too long"}) + b"\n")
+            continue
+        try:
+            item = BaziBatchItem.model_validate_json(raw)
+            result = calculate_bazi(
+                item.birth_year,
+                item.birth_month,
+                item.birth_day,
+                item.birth_hour,
+                item.birth_minute,
+                item.longitude,
+                item.tz_offset,
+                profile,
+            )
+            record = {"line": line_no, "result": result}
+        except Exception as e:
+            record = {"line": line_no, "error": str(e)}
+        out.append(dumps(record) + b"\n")
+    return b"".join(out)
+
+async def _stream_ndjson_charts(request: Request, profile="full"):
+    pending = b""
+    line_no = 1
+    skipping = False  # inside an over-long line that has already been reported
+    async for chunk in request.stream():
+        if skipping:
+            newline = chunk.find(b"\n")
+            if newline < 0:
+                continue
+            chunk = chunk[newline + 1:]
+            skipping = False
+            line_no += 1
+        pending += chunk
+        lines = pending.split(b"\n")
+        pending = lines.pop()
+        if lines:
+            yield await run_in_threadpool(_chart_ndjson_lines, lines, line_no, profile)
+            line_no += len(lines)
+        if len(pending) > MAX_NDJSON_LINE_BYTES:
+            yield dumps({"line": line_no, "error": "line too long"}) + b"\n"
+            pending = b""
+            skipping = True
+    if pending:
+        yield await run_in_threadpool(_chart_ndjson_lines, [pending], line_no, profile)
+
+@app.post("/bazi/stream")
+async def bazi_stream_endpoint(request: Request, profile: ChartProfile = PROFILE_QUERY):
+    return _RequestBodyStreamingResponse(_stream_ndjson_charts(request, profile), media_type="application/x-ndjson")
+
+# ------------------------------
+# Chart-driven name suggestions
+#   Charts the birth time, then searches names built from characters of the chart's
+#   weak elements (the single weakest element when none is missing); desired_element
+#   narrows the search to one of them and is rejected with 422 otherwise. Results are
+#   paginated: pass the returned next_cursor back as cursor for the next page.
+# ------------------------------
+@app.post("/names")
+def names_endpoint(req: NameRequest):
+    try:
+        chart = calculate_bazi(
             req.birth_year,
             req.birth_month,
             req.birth_day,
             req.birth_hour,
             req.birth_minute,
+            req.longitude,
+            req.tz_offset,
         )
-        return result
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    weak_elements = chart["weak_elements"] or [chart["classification"]["weakest"]]
+    if req.desired_element is not None and req.desired_element not in weak_elements:
+        raise HTTPException(
+            status_code=422,
+            detail=f"desired_element {req.desired_element!r} is not one of the chart's weak elements {weak_elements}")
+    character_data, surname_strokes = name_analyzer.get_best_characters(weak_elements, KXZD_CSV_PATH, req.surname)
+    if surname_strokes is None:
+        raise HTTPException(status_code=404, detail=f"Surname {req.surname!r} not found in character dictionary")
+
+    try:
+        page = name_analyzer.page_san_cai_wu_ge(
+            character_data, surname_strokes, req.desired_element, cursor=req.cursor, limit=req.limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return {
+        "bazi": chart["bazi"],
+        "weak_elements": weak_elements,
+        "surname": req.surname,
+        "surname_strokes": surname_strokes,
+        "items": page["items"],
+        "next_cursor": page["next_cursor"]
+    }
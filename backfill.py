@@ -0,0 +1,173 @@
+# backfill.py
+#   Offline BaZi backfill: chart every birth record in a CSV (or Parquet, when pyarrow
+#   is installed) file across a process pool and write NDJSON results.
+#
+#   python backfill.py births.csv charts.ndjson --workers 32
+#
+#   Input columns: birth_year, birth_month, birth_day, birth_hour, birth_minute, and
+#   optionally longitude, tz_offset and id. Each output line is
+#   {"row": n, "id": ..., "result": {...}} or {"row": n, "id": ..., "error": "..."},
+#   with n the 0-based input row, in input order.
+#
+#   --profile pillars|scores|full (default full) trims each result as the API's
+#   ?profile= does.
+#
+#   Rows are read and charted in chunks; at most a few chunks per worker are in flight,
+#   so memory stays bounded. After each chunk is written the output is flushed and a
+#   checkpoint (rows done, output size) is saved next to the output. Re-running the
+#   same command resumes from the checkpoint; --restart ignores it.
+import argparse
+import csv
+import json
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from bazi_calculator import PROFILES, calculate_bazi
+
+DEFAULT_CHUNK_SIZE = 2000
+
+# ------------------------------
+# Input readers
+#   Both yield one dict per row, streaming the file.
+# ------------------------------
+def _read_csv(path):
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        yield from csv.DictReader(f)
+
+def _read_parquet(path):
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise SystemExit("Parquet input needs pyarrow: pip install pyarrow")
+    for batch in pq.ParquetFile(path).iter_batches():
+        yield from batch.to_pylist()
+
+def read_rows(path):
+    if path.lower().endswith((".parquet", ".pq")):
+        return _read_parquet(path)
+    return _read_csv(path)
+
+# ------------------------------
+# Worker side
+#   Runs in the pool processes; each process charts with its own module-level
+#   DEFAULT_CALCULATOR (and caches). Returns the chunk already serialized so the
+#   parent only has to write bytes.
+# ------------------------------
+def _optional_float(value, default):
+    if value is None or value == "":
+        return default
+    return float(value)
+
+def chart_chunk(first_row, rows, profile="full"):
+    out = []
+    for offset, row in enumerate(rows):
+        record = {"row": first_row + offset}
+        if row.get("id") not in (None, ""):
+            record["id"] = row["id"]
+        try:
+            record["result"] = calculate_bazi(
+                int(row["birth_year"]),
+                int(row["birth_month"]),
+                int(row["birth_day"]),
+                int(row["birth_hour"]),
+                int(row["birth_minute"]),
+                _optional_float(row.get("longitude"), 103.8),
+                _optional_float(row.get("tz_offset"), 8.0),
+                profile,
+            )
+        except Exception as e:
+            record["error"] = str(e)
+        out.append(json.dumps(record, ensure_ascii=False) + "\n")
+    return "".join(out).encode("utf-8")
+
+# ------------------------------
+# Checkpointing
+# ------------------------------
+def load_checkpoint(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {"rows_done": 0, "output_bytes": 0}
+
+def save_checkpoint(path, rows_done, output_bytes):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"rows_done": rows_done, "output_bytes": output_bytes}, f)
+    os.replace(tmp_path, path)
+
+# ------------------------------
+# Driver
+# ------------------------------
+def backfill(input_path, output_path, workers=None, chunk_size=DEFAULT_CHUNK_SIZE, checkpoint_path=None, restart=False,
+             profile="full"):
+    checkpoint_path = checkpoint_path or output_path + ".checkpoint"
+    if restart and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    state = load_checkpoint(checkpoint_path)
+    rows_done, output_bytes = state["rows_done"], state["output_bytes"]
+    # Resuming needs every checkpointed byte; the output may only be longer (a partial chunk)
+    if rows_done:
+        size = os.path.getsize(output_path) if os.path.exists(output_path) else None
+        if size is None or size < output_bytes:
+            found = "is missing" if size is None else f"has {size} bytes"
+            raise SystemExit(f"{output_path} {found}, but checkpoint {checkpoint_path} records {rows_done} rows "
+                             f"in {output_bytes} bytes; rerun with --restart to start over")
+
+    rows = read_rows(input_path)
+    # Skip rows already written; anything past the checkpointed size is a partial chunk
+    for _ in islice(rows, rows_done):
+        pass
+
+    workers = workers or os.cpu_count() or 1
+    mode = "r+b" if rows_done else "wb"
+    with open(output_path, mode) as out, ProcessPoolExecutor(max_workers=workers) as pool:
+        out.truncate(output_bytes)  # only ever shrinks: drops a partial chunk
+        out.seek(output_bytes)
+        max_in_flight = workers * 2
+        in_flight = deque()
+        next_row = rows_done
+
+        def write_oldest():
+            nonlocal rows_done, output_bytes
+            chunk_rows, future = in_flight.popleft()
+            data = future.result()
+            out.write(data)
+            out.flush()
+            os.fsync(out.fileno())
+            rows_done += chunk_rows
+            output_bytes += len(data)
+            save_checkpoint(checkpoint_path, rows_done, output_bytes)
+
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+            in_flight.append((len(chunk), pool.submit(chart_chunk, next_row, chunk, profile)))
+            next_row += len(chunk)
+            if len(in_flight) >= max_in_flight:
+                write_oldest()
+        while in_flight:
+            write_oldest()
+
+    return rows_done
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Chart BaZi for every birth record in a CSV/Parquet file.")
+    parser.add_argument("input", help="CSV or Parquet (.parquet/.pq) file of birth records")
+    parser.add_argument("output", help="NDJSON output file")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="rows per task")
+    parser.add_argument("--checkpoint", default=None, help="checkpoint file (default: OUTPUT.checkpoint)")
+    parser.add_argument("--restart", action="store_true", help="ignore an existing checkpoint and start over")
+    parser.add_argument("--profile", choices=PROFILES, default="full", help="result fields (default: full)")
+    args = parser.parse_args(argv)
+
+    total = backfill(args.input, args.output, args.workers, args.chunk_size, args.checkpoint, args.restart, args.profile)
+    print(f"{total} rows written to {args.output}", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -1,31 +1,187 @@
 # bazi_calculator.py
+from collections import OrderedDict
 from datetime import datetime, timedelta
+from types import MappingProxyType
 import math
+import threading
+import time
 
 # Make sure lunar_python is installed: pip install lunar_python
 from lunar_python import Solar, Lunar
 
+import pillar_engine
+from pillar_engine import GAN, DayPillars, pillars_from_day
+
+# ------------------------------
+# Civil time conversion
+# From 1950 until 1981, Singapore’s civil time was UTC+7:30, not +8:00. On 1 Jan 1982, Singapore advanced clocks by 30 minutes, switching to UTC+8:00 permanently.
+# ------------------------------
+def _get_singapore_tz_offset_hours_1950_onwards(dt: datetime) -> float:
+    cutoff = datetime(1982, 1, 1, 0, 0)
+    if dt < cutoff:
+        return 7.5  # UTC+07:30 (pre-1982 Singapore)
+    else:
+        return 8.0  # UTC+08:00 (modern Singapore Time)
+
+# ------------------------------
+# Lookup tables
+#   Built once at import and shared by every BaziCalculator. They are wrapped in
+#   MappingProxyType so a shared calculator cannot be mutated by one request and
+#   leak into the next.
+# ------------------------------
+GAN_ELEMENT_MAP = MappingProxyType({"甲": "木", "乙": "木", "丙": "火", "丁": "火", "戊": "土", "己": "土", "庚": "金", "辛": "金", "壬": "水", "癸": "水"})
+ZHI_ELEMENT_MAP = MappingProxyType({"子": "水", "丑": "土", "寅": "木", "卯": "木", "辰": "土", "巳": "火", "午": "火", "未": "土", "申": "金", "酉": "金", "戌": "土", "亥": "水"})
+
+# Element meanings for English interpretation
+ELEMENT_MEANINGS = MappingProxyType({
+    "木": MappingProxyType({"name": "Wood", "traits": "Growth, creativity, expansion, leadership, and flexibility.", "advice": "You are visionary and ambitious. Stay grounded to avoid overextending."}),
+    "火": MappingProxyType({"name": "Fire", "traits": "Passion, energy, motivation, inspiration, and visibility.", "advice": "You are charismatic and expressive. Balance intensity with patience."}),
+    "土": MappingProxyType({"name": "Earth", "traits": "Stability, reliability, nurturing, practicality, and organization.", "advice": "You are dependable and thoughtful. Avoid being overly cautious or stagnant."}),
+    "金": MappingProxyType({"name": "Metal", "traits": "Discipline, strength, precision, logic, and determination.", "advice": "You are principled and strong-willed. Loosen rigidity with empathy."}),
+    "水": MappingProxyType({"name": "Water", "traits": "Wisdom, intuition, adaptability, and communication.", "advice": "You are reflective and insightful. Avoid overthinking or hesitation."})
+})
+
+ELEMENT_RELATIONSHIPS = MappingProxyType({
+    '金': MappingProxyType({'generates': '水', 'controls': '木', 'generated_by': '土', 'controlled_by': '火'}),
+    '木': MappingProxyType({'generates': '火', 'controls': '土', 'generated_by': '水', 'controlled_by': '金'}),
+    '水': MappingProxyType({'generates': '木', 'controls': '火', 'generated_by': '金', 'controlled_by': '土'}),
+    '火': MappingProxyType({'generates': '土', 'controls': '金', 'generated_by': '木', 'controlled_by': '水'}),
+    '土': MappingProxyType({'generates': '金', 'controls': '水', 'generated_by': '火', 'controlled_by': '木'})
+})
+
+# Element order used for score dicts (and, by extension, response key order)
+ELEMENTS = ("木", "火", "土", "金", "水")
+
+# Response profiles of calculate_bazi, smallest first:
+#   "pillars" - {"bazi"}: the four pillars plus the per-call fields
+#   "scores"  - adds "five_elements_scores"
+#   "full"    - adds ranking, percentages, weak elements, strategies, classification and
+#               interpretation (the default)
+PROFILES = ("pillars", "scores", "full")
+
+# Version of the chart output for given inputs. Part of the HTTP ETag of GET /bazi, so
+# bump it whenever a change alters any chart (pillar rules, solar-term table, scoring,
+# classification or interpretation texts). HTTP caches keep serving the old chart until
+# their max-age (app.CHART_MAX_AGE_SECONDS) runs out; the revalidation then sees the new
+# ETag and fetches the new chart.
+CHART_ALGORITHM_VERSION = "1"
+
+# ------------------------------
+# lunar_python pillar source
+#   Reference implementation of the day-level pillars (see pillar_engine.DayPillars),
+#   taken from EightChar at 00:00 and, on jie days, at the jie instant.
+# ------------------------------
+def _eight_char(dt: datetime):
+    return Solar.fromYmdHms(dt.year, dt.month, dt.day, dt.hour, dt.minute, dt.second).getLunar().getEightChar()
+
+def lunar_day_pillars(date) -> DayPillars:
+    lunar = Solar.fromYmdHms(date.year, date.month, date.day, 0, 0, 0).getLunar()
+    eight_char = lunar.getEightChar()
+    year_pillar, month_pillar, day_pillar = eight_char.getYear(), eight_char.getMonth(), eight_char.getDay()
+
+    boundary, year_after, month_after = None, year_pillar, month_pillar
+    jie_solar = lunar.getNextJie().getSolar()
+    if (jie_solar.getYear(), jie_solar.getMonth(), jie_solar.getDay()) == (date.year, date.month, date.day):
+        boundary = datetime(date.year, date.month, date.day, jie_solar.getHour(), jie_solar.getMinute(), jie_solar.getSecond())
+        after = _eight_char(boundary)
+        year_after, month_after = after.getYear(), after.getMonth()
+
+    return DayPillars(year_pillar, month_pillar, day_pillar, GAN.index(day_pillar[0]), boundary, year_after, month_after)
+
+# ------------------------------
+# Chart cache
+#   Thread-safe LRU with a size cap and TTL, keyed by the true-solar-time minute.
+#   hits/misses are kept so the cache can be sized from production traffic.
+#   The same class backs the day-pillar cache (keyed by solar date, ttl=None: no expiry).
+# ------------------------------
+CHART_CACHE_MAXSIZE = 100_000
+CHART_CACHE_TTL_SECONDS = 24 * 60 * 60
+DAY_PILLAR_CACHE_MAXSIZE = 200 * 366  # every day of a 200-year range
+
+# Charts are cached frozen, every dict as a tuple of (key, value) items and every list
+# as a tuple, and _thaw_chart rebuilds fresh dicts/lists for each caller, so mutating a
+# returned chart cannot leak into the cache and from there into later calls
+def _freeze(value):
+    if isinstance(value, dict):
+        return tuple((k, _freeze(v)) for k, v in value.items())
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+def _thaw_chart(frozen):
+    # Inverse of _freeze for a full chart, spelled out for its fixed shape (a generic
+    # recursive copy costs several times more per cache hit)
+    chart = dict(frozen)
+    classification = dict(chart["classification"])
+    classification["percentages"] = dict(classification["percentages"])
+    return {
+        "bazi": dict(chart["bazi"]),
+        "classification": classification,
+        "five_elements_scores": dict(chart["five_elements_scores"]),
+        "ranked_elements": [dict(entry) for entry in chart["ranked_elements"]],
+        "weak_elements": list(chart["weak_elements"]),
+        "balance_strategies": list(chart["balance_strategies"]),
+        "interpretation": {key: dict(value) for key, value in chart["interpretation"]}
+    }
+
+class ChartCache:
+    def __init__(self, maxsize: int = CHART_CACHE_MAXSIZE, ttl: float | None = CHART_CACHE_TTL_SECONDS):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key, compute):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        # Compute outside the lock; concurrent misses on one key just compute it twice
+        value = compute(key)
+        with self._lock:
+            expires_at = float("inf") if self.ttl is None else now + self.ttl
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
 class BaziCalculator:
-    def __init__(self):
-        # Element meanings for English interpretation
-        self.element_meanings = {
-            "木": {"name": "Wood", "traits": "Growth, creativity, expansion, leadership, and flexibility.", "advice": "You are visionary and ambitious. Stay grounded to avoid overextending."},
-            "火": {"name": "Fire", "traits": "Passion, energy, motivation, inspiration, and visibility.", "advice": "You are charismatic and expressive. Balance intensity with patience."},
-            "土": {"name": "Earth", "traits": "Stability, reliability, nurturing, practicality, and organization.", "advice": "You are dependable and thoughtful. Avoid being overly cautious or stagnant."},
-            "金": {"name": "Metal", "traits": "Discipline, strength, precision, logic, and determination.", "advice": "You are principled and strong-willed. Loosen rigidity with empathy."},
-            "水": {"name": "Water", "traits": "Wisdom, intuition, adaptability, and communication.", "advice": "You are reflective and insightful. Avoid overthinking or hesitation."}
-        }
-    # ------------------------------
-    # Civil time conversion
-    # From 1950 until 1981, Singapore’s civil time was UTC+7:30, not +8:00. On 1 Jan 1982, Singapore advanced clocks by 30 minutes, switching to UTC+8:00 permanently.
-    # ------------------------------
-    def _get_singapore_tz_offset_hours_1950_onwards(dt: datetime) -> float:
-        cutoff = datetime(1982, 1, 1, 0, 0)
-        if dt < cutoff:
-            return 7.5  # UTC+07:30 (pre-1982 Singapore)
-        else:
-            return 8.0  # UTC+08:00 (modern Singapore Time)
-        
+    # All tables live at module level; the only per-instance state is the optional
+    # (thread-safe) chart and day-pillar caches, so one instance can be shared process-wide.
+    # day_pillars: date -> DayPillars, e.g. pillar_engine.day_pillars or lunar_day_pillars.
+    element_meanings = ELEMENT_MEANINGS
+
+    def __init__(self, cache: ChartCache | None = None, day_cache: ChartCache | None = None, day_pillars=None):
+        self.cache = cache
+        self.day_cache = day_cache
+        self.day_pillars = day_pillars
+
     # ------------------------------
     # True solar time conversion
     #    Convert local civil time to approximate true solar time based on longitude.
@@ -48,8 +204,13 @@ class BaziCalculator:
     #   longitude: degrees east (Singapore ≈ 103.8). tz_offset: hours from UTC.
     #   Returns a dict containing pillars, five-element scores, percentages, ranking,
     #   weak elements, strategies, classification, and English interpretation.
+    #   profile (see PROFILES) trims the result; "pillars" and "scores" skip the
+    #   analysis entirely and do not go through the chart cache.
     # ------------------------------
-    def calculate_bazi(self, year, month, day, hour, minute, longitude: float = 103.8, tz_offset: float | None = None):
+    def calculate_bazi(self, year, month, day, hour, minute, longitude: float = 103.8, tz_offset: float | None = None,
+                       profile: str = "full"):
+        if profile not in PROFILES:
+            raise ValueError(f"unknown profile {profile!r} (expected one of {', '.join(PROFILES)})")
         civil_dt = datetime(year, month, day, hour, minute)
 
         if tz_offset is None:
@@ -58,62 +219,104 @@ class BaziCalculator:
         # 1) Convert to true solar time according to longitude/timezone
         solar_time = self.to_true_solar_time(year, month, day, hour, minute, longitude, tz_offset)
 
-        # 2) Use lunar_python Solar -> Lunar -> EightChar for accurate GanZhi
-        solar = Solar.fromYmdHms(solar_time.year, solar_time.month, solar_time.day, solar_time.hour, solar_time.minute, 0)
-        lunar = solar.getLunar()
-        eight_char = lunar.getEightChar()
+        # 2) Pillars and analysis depend only on the solar minute (seconds are dropped
+        #    before the GanZhi lookup), so every input landing on the same minute shares a chart
+        solar_minute = solar_time.replace(second=0, microsecond=0)
+        if profile == "pillars":
+            chart = {"bazi": self._pillars_dict(solar_minute)}
+        elif profile == "scores":
+            pillars = self._pillars_dict(solar_minute)
+            chart = {"bazi": pillars, "five_elements_scores": self._element_scores(pillars)}
+        elif self.cache is None:
+            chart = self._chart_for_solar_minute(solar_minute)
+        else:
+            chart = _thaw_chart(self.cache.get_or_compute(solar_minute, self._frozen_chart_for_solar_minute))
+
+        # Every path above yields a chart of fresh objects owned by this caller
+        pillars = chart["bazi"]
+        pillars["adjusted_to_true_solar_time"] = solar_time.strftime("%Y-%m-%d %H:%M:%S")
+        pillars["longitude"] = longitude
+        pillars["tz_offset"] = tz_offset
+        return chart
+
+    def _frozen_chart_for_solar_minute(self, solar_time: datetime):
+        return _freeze(self._chart_for_solar_minute(solar_time))
 
-        # eight_char.getYear() returns e.g. "甲子", getMonth(), getDay(), getTime()
-        year_pillar = eight_char.getYear()
-        month_pillar = eight_char.getMonth()
-        day_pillar = eight_char.getDay()
-        hour_pillar = eight_char.getTime()
+    # ------------------------------
+    # Chart for a true-solar-time minute
+    #   Everything in the result that does not depend on the raw inputs: the four
+    #   pillars and the five-element analysis. Cached in frozen form, see _freeze.
+    # ------------------------------
+    def _chart_for_solar_minute(self, solar_time: datetime):
+        # 1) Four pillars (lunar_python, or the day-pillar cache when configured)
+        pillars = self._pillars_dict(solar_time)
 
-        pillars = {
+        # 2) Count five-elements from stems & branches
+        scores = self._element_scores(pillars)
+
+        # 3) Ranking, percentages, missing elements, strategies, classification, interpretation
+        ranked, missing, strategies, classification, interpretation = self.rank_and_interpret(scores)
+
+        return {
+            "bazi": pillars,
+            "classification": classification,
+            "five_elements_scores": scores,
+            "ranked_elements": ranked,
+            "weak_elements": missing,
+            "balance_strategies": strategies,
+            "interpretation": interpretation
+        }
+
+    def _pillars_dict(self, solar_time: datetime):
+        year_pillar, month_pillar, day_pillar, hour_pillar = self._pillars_for_solar_minute(solar_time)
+        return {
             "year_pillar": year_pillar,
             "month_pillar": month_pillar,
             "day_pillar": day_pillar,
-            "hour_pillar": hour_pillar,
-            "adjusted_to_true_solar_time": solar_time.strftime("%Y-%m-%d %H:%M:%S"),
-            "longitude": longitude,
-            "tz_offset": tz_offset
+            "hour_pillar": hour_pillar
         }
 
-        # 3) Count five-elements from stems & branches
+    def _element_scores(self, pillars):
         # We'll break each pillar into stem+branch chars, then map to element
-        gan_element_map = {"甲": "木", "乙": "木", "丙": "火", "丁": "火", "戊": "土", "己": "土", "庚": "金", "辛": "金", "壬": "水", "癸": "水"}
-        zhi_element_map = {"子": "水", "丑": "土", "寅": "木", "卯": "木", "辰": "土", "巳": "火", "午": "火", "未": "土", "申": "金", "酉": "金", "戌": "土", "亥": "水"}
 
         # Collect characters: stems and branches of each pillar
         # Each pillar string is usually 2 chars e.g. "甲子" -> stem '甲', branch '子'
         chars = []
-        for p in (year_pillar, month_pillar, day_pillar, hour_pillar):
+        for p in pillars.values():
             if isinstance(p, str) and len(p) >= 2:
                 chars.append(p[0])   # stem
                 chars.append(p[1])   # branch
 
-        scores = {"木": 0, "火": 0, "土": 0, "金": 0, "水": 0}
+        scores = dict.fromkeys(ELEMENTS, 0)
         for ch in chars:
-            if ch in gan_element_map:
-                scores[gan_element_map[ch]] += 1
-            elif ch in zhi_element_map:
-                scores[zhi_element_map[ch]] += 1
+            if ch in GAN_ELEMENT_MAP:
+                scores[GAN_ELEMENT_MAP[ch]] += 1
+            elif ch in ZHI_ELEMENT_MAP:
+                scores[ZHI_ELEMENT_MAP[ch]] += 1
             else:
                 # ignore unknown char (defensive)
                 pass
+        return scores
 
-        # 4) Ranking, percentages, missing elements, strategies, classification, interpretation
-        ranked, missing, strategies, classification, interpretation = self.rank_and_interpret(scores)
+    # ------------------------------
+    # Pillars for a true-solar-time minute
+    #   Without a day_pillars source: one lunar_python Solar -> Lunar -> EightChar chain
+    #   per call (the reference path). Otherwise year/month/day pillars come from the
+    #   day_pillars source (through the day cache when configured) and the hour pillar
+    #   is derived arithmetically.
+    # ------------------------------
+    def _pillars_for_solar_minute(self, solar_time: datetime):
+        if self.day_pillars is None:
+            # Use lunar_python Solar -> Lunar -> EightChar for accurate GanZhi
+            eight_char = _eight_char(solar_time)
+            # eight_char.getYear() returns e.g. "甲子", getMonth(), getDay(), getTime()
+            return eight_char.getYear(), eight_char.getMonth(), eight_char.getDay(), eight_char.getTime()
 
-        return {
-            "bazi": pillars,
-            "classification": classification,
-            "five_elements_scores": scores,
-            "ranked_elements": ranked,
-            "weak_elements": missing,
-            "balance_strategies": strategies,
-            "interpretation": interpretation
-        }
+        if self.day_cache is None:
+            day = self.day_pillars(solar_time.date())
+        else:
+            day = self.day_cache.get_or_compute(solar_time.date(), self.day_pillars)
+        return pillars_from_day(day, solar_time)
 
     # ------------------------------
     # Ranking & interpretation helpers
@@ -129,15 +332,7 @@ class BaziCalculator:
         average = total / 5 if total > 0 else 0
         missing_elements = [e for e, v in ranked_elements if v <= math.floor(average * 0.6)]
 
-        element_relationships = {
-            '金': {'generates': '水', 'controls': '木', 'generated_by': '土', 'controlled_by': '火'},
-            '木': {'generates': '火', 'controls': '土', 'generated_by': '水', 'controlled_by': '金'},
-            '水': {'generates': '木', 'controls': '火', 'generated_by': '金', 'controlled_by': '土'},
-            '火': {'generates': '土', 'controls': '金', 'generated_by': '木', 'controlled_by': '水'},
-            '土': {'generates': '金', 'controls': '水', 'generated_by': '火', 'controlled_by': '木'}
-        }
-
-        strategies = self.balance_elements(scores, missing_elements, element_relationships)
+        strategies = self.balance_elements(scores, missing_elements, ELEMENT_RELATIONSHIPS)
         classification = self.classify_balance(percentages)
         interpretation = self.interpret_elements(classification)
 
@@ -202,12 +397,13 @@ class BaziCalculator:
             }
         }
 
-# Convenience function
-def calculate_bazi(year, month, day, hour, minute, longitude: float = 103.8, tz_offset: float = 8.0):
-    calc = BaziCalculator()
-    return calc.calculate_bazi(year, month, day, hour, minute, longitude, tz_offset)
-
-
-
-
+# Process-wide calculator shared by the API and the convenience function below
+DEFAULT_CALCULATOR = BaziCalculator(
+    cache=ChartCache(),
+    day_cache=ChartCache(maxsize=DAY_PILLAR_CACHE_MAXSIZE, ttl=None),
+    day_pillars=pillar_engine.day_pillars
+)
 
+# Convenience function
+def calculate_bazi(year, month, day, hour, minute, longitude: float = 103.8, tz_offset: float = 8.0, profile: str = "full"):
+    return DEFAULT_CALCULATOR.calculate_bazi(year, month, day, hour, minute, longitude, tz_offset, profile)
@@ -0,0 +1,143 @@
+# bazi_executor.py
+#   Execution backend for chart requests, chosen by environment variables:
+#
+#     BAZI_EXECUTOR              "inline"  - compute on the event loop (no pool)
+#                                "thread"  - dedicated thread pool (default)
+#                                "process" - process pool; every worker is warmed up
+#                                            at startup and charts with its own
+#                                            module-level BaziCalculator and caches
+#     BAZI_EXECUTOR_WORKERS      pool size (default: CPU count)
+#     BAZI_EXECUTOR_MAX_PENDING  jobs admitted at once, running plus queued
+#                                (default: 4 per worker)
+#     BAZI_RETRY_AFTER_SECONDS   Retry-After sent with a 503 (default: 1)
+#
+#   Backpressure: once max_pending jobs are admitted, run() raises ExecutorOverloaded
+#   immediately instead of queueing, so the handler can answer 503 and latency for
+#   admitted requests stays bounded by the queue length.
+#
+#   A process pool whose worker died (OOM kill, segfault) is unusable for good; the
+#   jobs that hit it raise WorkerPoolRestarted (also a 503) while a fresh pool is
+#   created and warmed up in the background. shutdown() cancels that warm-up, and no
+#   pool is created once shutdown has begun.
+#
+#   Caches: every process charts with its own module-level caches. With the process
+#   backend, /bazi charts in the workers, so the API process's /bazi/cache counters
+#   only cover the endpoints that chart in the API process itself.
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+BACKENDS = ("inline", "thread", "process")
+
+class ExecutorOverloaded(Exception):
+    pass
+
+class WorkerPoolRestarted(ExecutorOverloaded):
+    pass
+
+# ------------------------------
+# Process-pool worker side
+# ------------------------------
+def _warm_worker():
+    # Import the calculator (lunar_python, jieqi table) and fill the first cache entries
+    # before any request reaches this process
+    from bazi_calculator import calculate_bazi
+    calculate_bazi(2000, 1, 1, 12, 0)
+
+def _ready():
+    return os.getpid()
+
+class ChartExecutor:
+    def __init__(self, backend="thread", workers=None, max_pending=None, retry_after=1):
+        if backend not in BACKENDS:
+            raise ValueError(f"unknown executor backend {backend!r} (expected one of {', '.join(BACKENDS)})")
+        self.backend = backend
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending or self.workers * 4
+        self.retry_after = retry_after
+        self.pending = 0
+        self.rejected = 0
+        self.restarts = 0
+        self._pool = None
+        self._warm_up = None  # background re-warm task after a restart
+        self._closed = False
+
+    @classmethod
+    def from_env(cls, environ=os.environ):
+        return cls(
+            backend=environ.get("BAZI_EXECUTOR", "thread"),
+            workers=int(environ.get("BAZI_EXECUTOR_WORKERS", 0)) or None,
+            max_pending=int(environ.get("BAZI_EXECUTOR_MAX_PENDING", 0)) or None,
+            retry_after=int(environ.get("BAZI_RETRY_AFTER_SECONDS", 1)),
+        )
+
+    def _ensure_pool(self):
+        if self._closed:
+            raise RuntimeError("chart executor is shut down")
+        if self._pool is None:
+            if self.backend == "thread":
+                self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bazi")
+            elif self.backend == "process":
+                self._pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_warm_worker)
+        return self._pool
+
+    async def start(self):
+        # Create the pool and, for processes, wait until every worker has been warmed up
+        if self._closed:
+            return
+        pool = self._ensure_pool()
+        if self.backend == "process":
+            loop = asyncio.get_running_loop()
+            await asyncio.gather(*(loop.run_in_executor(pool, _ready) for _ in range(self.workers)))
+
+    async def shutdown(self):
+        # Waiting for the workers happens in a thread so the event loop stays responsive
+        self._closed = True
+        warm_up, self._warm_up = self._warm_up, None
+        if warm_up is not None:
+            warm_up.cancel()
+            try:
+                await warm_up
+            except (asyncio.CancelledError, Exception):  # cancelled, or the new pool failed as well
+                pass
+        pool, self._pool = self._pool, None
+        if pool is not None:
+            await asyncio.to_thread(pool.shutdown, wait=True, cancel_futures=True)
+
+    def _restart_pool(self, broken):
+        # Only the first job to see a given broken pool replaces it
+        if self._pool is not broken:
+            return
+        self._pool = None
+        broken.shutdown(wait=False, cancel_futures=True)
+        if not self._closed:
+            self.restarts += 1
+            self._warm_up = asyncio.ensure_future(self.start())
+
+    async def run(self, fn, *args):
+        # fn must be a module-level function for the process backend (it is pickled)
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise ExecutorOverloaded(f"{self.pending} chart requests already pending")
+        if self.backend == "inline":
+            return fn(*args)
+        self.pending += 1
+        pool = self._ensure_pool()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(pool, fn, *args)
+        except BrokenProcessPool:
+            self._restart_pool(pool)
+            raise WorkerPoolRestarted("chart worker pool failed and is being restarted")
+        finally:
+            self.pending -= 1
+
+    def stats(self):
+        return {
+            "backend": self.backend,
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "pending": self.pending,
+            "rejected": self.rejected,
+            "restarts": self.restarts
+        }
@@ -0,0 +1,90 @@
+# bazi_vectorized.py
+#   NumPy-vectorized four pillars and five-element scores for whole populations.
+#   Same arithmetic as pillar_engine and the same element mapping as
+#   BaziCalculator.calculate_bazi, applied to arrays with no per-row Python loop.
+#
+#   Requires numpy (analytics only, not needed by the API): pip install numpy
+import numpy as np
+
+import jieqi_table
+from bazi_calculator import ELEMENTS, GAN_ELEMENT_MAP, ZHI_ELEMENT_MAP
+from pillar_engine import GAN, JIEQI_TABLE, ZHI
+
+# Element code (index into ELEMENTS) of each stem / branch index
+GAN_ELEMENT_CODES = np.array([ELEMENTS.index(GAN_ELEMENT_MAP[g]) for g in GAN], dtype=np.int8)
+ZHI_ELEMENT_CODES = np.array([ELEMENTS.index(ZHI_ELEMENT_MAP[z]) for z in ZHI], dtype=np.int8)
+
+_JIEQI = np.frombuffer(JIEQI_TABLE, dtype=np.int64)
+
+# Julian day number of 1970-01-01
+_JDN_EPOCH = 2440588
+
+PILLAR_NAMES = ("year", "month", "day", "hour")
+
+# ------------------------------
+# Vectorized calculation
+#   datetimes: civil local birth times (anything np.asarray can turn into datetime64;
+#   seconds are dropped as in the scalar API). longitudes / tz_offsets: arrays of the
+#   same length or scalars, with the scalar API's defaults.
+#   Returns a dict of arrays: "<pillar>_gan" (0-9) and "<pillar>_zhi" (0-11) for each
+#   of year/month/day/hour, "solar_minutes" (true solar time, minutes since 1970-01-01)
+#   and "scores", an N x 5 int8 matrix with columns in ELEMENTS order.
+# ------------------------------
+def calculate_bazi_many(datetimes, longitudes=103.8, tz_offsets=8.0):
+    civil_us = np.atleast_1d(np.asarray(datetimes, dtype="datetime64[m]")).astype("datetime64[us]").astype(np.int64)
+    longitudes = np.asarray(longitudes, dtype=np.float64)
+    tz_offsets = np.asarray(tz_offsets, dtype=np.float64)
+
+    # True solar time, same float steps as BaziCalculator.to_true_solar_time, then the minute
+    diff_hours = (longitudes - tz_offsets * 15.0) / 15.0
+    solar_us = civil_us + np.round(diff_hours * 3_600_000_000.0).astype(np.int64)
+    solar_minutes = np.floor_divide(solar_us, 60_000_000)
+    solar_seconds = solar_minutes * 60
+
+    if solar_seconds.size and (solar_seconds.min() < _JIEQI[1] or solar_seconds.max() >= _JIEQI[-1]):
+        first = jieqi_table.from_epoch_seconds(int(_JIEQI[1]))
+        last = jieqi_table.from_epoch_seconds(int(_JIEQI[-1]))
+        raise ValueError(f"true solar time outside the solar-term table ({first} to {last})")
+
+    # Day pillar: Julian day number
+    jdn = np.floor_divide(solar_minutes, 1440) + _JDN_EPOCH
+    day_gan = (jdn - 11) % 10
+    day_zhi = (jdn - 11) % 12
+
+    # Hour pillar: day stem plus hour branch; the late Zi hour takes the next day's stem
+    hour = np.floor_divide(solar_minutes % 1440, 60)
+    hour_zhi = (hour + 1) // 2 % 12
+    hour_gan = ((day_gan + (hour == 23)) % 5 * 2 + hour_zhi) % 10
+
+    # Year/month pillars: last jie at or before the instant (odd positions in the table)
+    position = np.searchsorted(_JIEQI, solar_seconds, side="right") - 1
+    position -= (position % 2 == 0)
+    jie_count = (position - 1) // 2
+    ganzhi_year = jieqi_table.FIRST_YEAR - 1 + (jie_count + 11) // 12
+    month_index = (jie_count - 1) % 12
+    year_gan = (ganzhi_year - 4) % 10
+    year_zhi = (ganzhi_year - 4) % 12
+    month_gan = ((ganzhi_year - 4) % 5 * 2 + 2 + month_index) % 10
+    month_zhi = (2 + month_index) % 12
+
+    result = {"solar_minutes": solar_minutes}
+    gans = (year_gan, month_gan, day_gan, hour_gan)
+    zhis = (year_zhi, month_zhi, day_zhi, hour_zhi)
+    for name, gan, zhi in zip(PILLAR_NAMES, gans, zhis):
+        result[f"{name}_gan"] = gan.astype(np.int8)
+        result[f"{name}_zhi"] = zhi.astype(np.int8)
+
+    # Five-element scores: one point per stem and per branch
+    scores = np.zeros((solar_minutes.shape[0], len(ELEMENTS)), dtype=np.int8)
+    rows = np.arange(solar_minutes.shape[0])
+    for gan, zhi in zip(gans, zhis):
+        scores[rows, GAN_ELEMENT_CODES[gan]] += 1
+        scores[rows, ZHI_ELEMENT_CODES[zhi]] += 1
+    result["scores"] = scores
+    return result
+
+def pillar_strings(result, name: str):
+    # Object array of pillar strings (e.g. "甲子") for one of PILLAR_NAMES
+    gan_chars = np.array(list(GAN), dtype=object)
+    zhi_chars = np.array(list(ZHI), dtype=object)
+    return gan_chars[result[f"{name}_gan"]] + zhi_chars[result[f"{name}_zhi"]]
@@ -0,0 +1,106 @@
+# benchmarks.py
+#   Micro-benchmarks for the BaZi hot path. Run with: python benchmarks.py
+#   Numbers are per call; run on two commits to compare a change.
+import random
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+import pillar_engine
+from bazi_calculator import DEFAULT_CALCULATOR, BaziCalculator, ChartCache, calculate_bazi
+
+SAMPLE_BIRTH = (1990, 5, 17, 14, 30)
+SAMPLE_SOLAR_MINUTE = datetime(1990, 5, 17, 13, 25)
+SAMPLE_SCORES = {"木": 0, "火": 4, "土": 1, "金": 2, "水": 1}
+
+def time_per_call(func, repeat=2000):
+    func()  # warm up imports and lazy tables
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat
+
+def peak_bytes_per_call(func, repeat=50):
+    # Peak traced memory above the steady state, averaged over repeat calls
+    func()
+    tracemalloc.start()
+    total = 0
+    try:
+        for _ in range(repeat):
+            baseline = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            func()
+            total += tracemalloc.get_traced_memory()[1] - baseline
+    finally:
+        tracemalloc.stop()
+    return total / repeat
+
+def bench_calculator():
+    # No chart cache, so every call pays for its profile (the sample birth is always a
+    # chart-cache hit on DEFAULT_CALCULATOR)
+    uncached = BaziCalculator(day_cache=ChartCache(maxsize=1000, ttl=None), day_pillars=pillar_engine.day_pillars)
+    cases = {
+        "calculate_bazi (module function)": lambda: calculate_bazi(*SAMPLE_BIRTH),
+        "no chart cache, profile=full": lambda: uncached.calculate_bazi(*SAMPLE_BIRTH, profile="full"),
+        "no chart cache, profile=scores": lambda: uncached.calculate_bazi(*SAMPLE_BIRTH, profile="scores"),
+        "no chart cache, profile=pillars": lambda: uncached.calculate_bazi(*SAMPLE_BIRTH, profile="pillars"),
+        "rank_and_interpret": lambda: DEFAULT_CALCULATOR.rank_and_interpret(SAMPLE_SCORES),
+        "pillars: lunar_python EightChar": lambda: BaziCalculator()._pillars_for_solar_minute(SAMPLE_SOLAR_MINUTE),
+        "pillars: pillar_engine (uncached)": lambda: pillar_engine.pillars(SAMPLE_SOLAR_MINUTE),
+    }
+    for name, func in cases.items():
+        print(f"{name:40s} {time_per_call(func) * 1e6:9.1f} us/call  {peak_bytes_per_call(func):9.0f} B peak/call")
+
+def bench_vectorized(rows=1_000_000, scalar_rows=20_000):
+    # Vectorized calculate_bazi_many over `rows` random births vs looping the scalar API
+    # over `scalar_rows` of them (extrapolated to `rows`)
+    try:
+        import numpy as np
+        from bazi_vectorized import calculate_bazi_many
+    except ImportError:
+        print("bazi_vectorized: numpy not installed, skipped")
+        return
+
+    rng = random.Random(0)
+    start = datetime(1950, 1, 1)
+    births = [start + timedelta(minutes=rng.randrange(100 * 365 * 1440)) for _ in range(scalar_rows)]
+    datetimes = np.resize(np.array(births, dtype="datetime64[m]"), rows)
+
+    begin = time.perf_counter()
+    calculate_bazi_many(datetimes, 103.8, 8.0)
+    vectorized = time.perf_counter() - begin
+
+    begin = time.perf_counter()
+    for dt in births:
+        calculate_bazi(dt.year, dt.month, dt.day, dt.hour, dt.minute)
+    scalar = (time.perf_counter() - begin) * rows / scalar_rows
+
+    print(f"calculate_bazi_many, {rows} rows: {vectorized:.2f} s vectorized, ~{scalar:.1f} s scalar loop ({scalar / vectorized:.0f}x)")
+
+def bench_serialization():
+    # Cost of turning one chart into response bytes: FastAPI's default path
+    # (jsonable_encoder + JSONResponse), a declared response model (pydantic validation
+    # + dump_json), and FastJSONResponse with orjson or the stdlib fallback
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse
+
+    import fast_json
+    from app import ChartOut
+
+    chart = calculate_bazi(*SAMPLE_BIRTH)
+    cases = {
+        "jsonable_encoder + JSONResponse": lambda: JSONResponse(jsonable_encoder(chart)).body,
+        "response_model (pydantic dump_json)": lambda: ChartOut.model_validate(chart).model_dump_json(),
+        "fast_json: stdlib json": lambda: fast_json.dumps_stdlib(chart),
+    }
+    if fast_json.orjson is not None:
+        cases["fast_json: orjson"] = lambda: fast_json.orjson.dumps(chart)
+    else:
+        print("fast_json: orjson not installed, skipped")
+    for name, func in cases.items():
+        print(f"{name:40s} {time_per_call(func) * 1e6:9.1f} us/chart  {peak_bytes_per_call(func):9.0f} B peak/chart")
+
+if __name__ == "__main__":
+    bench_calculator()
+    bench_serialization()
+    bench_vectorized()
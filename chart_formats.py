@@ -0,0 +1,184 @@
+# chart_formats.py
+#   Binary output formats for the chart endpoints, picked by the Accept header:
+#
+#     application/json                       default (fast_json)
+#     application/msgpack                    same structure as the JSON body; needs msgpack
+#     application/vnd.apache.arrow.stream    Arrow IPC stream, one row per chart; needs pyarrow
+#
+#   Both libraries are listed in requirements.txt; a deployment without one of them
+#   still starts and simply does not offer that format during negotiation.
+#
+#   Arrow columns: index (int32), error (string, null on success), year/month/day/
+#   hour_pillar (dictionary<int8, string> over the 60 GanZhi pairs, so every batch
+#   shares one dictionary), adjusted_to_true_solar_time (string), longitude and
+#   tz_offset (float64), and when the profile includes them one int8 column per
+#   element, score_木 .. score_水. The remaining analysis fields of profile=full are
+#   only available as JSON or msgpack. The stream is sent as record batches of
+#   ARROW_BATCH_ROWS charts, each encoded and sent before the next one is built.
+from fastapi.responses import Response, StreamingResponse
+
+from bazi_calculator import ELEMENTS
+from pillar_engine import GAN, ZHI
+
+try:
+    import msgpack
+except ImportError:  # optional: pip install msgpack
+    msgpack = None
+
+try:
+    import pyarrow as pa
+except ImportError:  # optional: pip install pyarrow
+    pa = None
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+
+# Accepted spellings -> canonical media type
+_MEDIA_TYPES = {
+    JSON: JSON,
+    MSGPACK: MSGPACK,
+    "application/x-msgpack": MSGPACK,
+    ARROW_STREAM: ARROW_STREAM,
+}
+
+ARROW_BATCH_ROWS = 4096
+
+PILLAR_FIELDS = ("year_pillar", "month_pillar", "day_pillar", "hour_pillar")
+GANZHI = [GAN[i % 10] + ZHI[i % 12] for i in range(60)]
+_GANZHI_INDEX = {pillar: i for i, pillar in enumerate(GANZHI)}
+
+def available_media_types():
+    types = [JSON]
+    if msgpack is not None:
+        types.append(MSGPACK)
+    if pa is not None:
+        types.append(ARROW_STREAM)
+    return types
+
+# ------------------------------
+# Content negotiation
+#   Returns the canonical media type to answer with, or None when the Accept header
+#   only lists types that cannot be produced (the caller answers 406). No header,
+#   */* and application/* all mean JSON.
+# ------------------------------
+def negotiate(accept):
+    if not accept:
+        return JSON
+    available = available_media_types()
+    candidates = []
+    for position, part in enumerate(accept.split(",")):
+        media_type, *params = [item.strip() for item in part.split(";")]
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if q > 0:
+            candidates.append((-q, position, media_type.lower()))
+    for _, _, media_type in sorted(candidates):
+        if media_type in ("*/*", "application/*"):
+            return JSON
+        canonical = _MEDIA_TYPES.get(media_type)
+        if canonical in available:
+            return canonical
+    return None
+
+# ------------------------------
+# MessagePack
+# ------------------------------
+class MsgpackResponse(Response):
+    media_type = MSGPACK
+
+    def render(self, content) -> bytes:
+        return msgpack.packb(content, use_bin_type=True)
+
+# ------------------------------
+# Arrow IPC stream
+#   rows: [{"index", "result"} or {"index", "error"}], as built by /bazi/batch. The
+#   schema is fixed for the whole response (score columns when any chart has scores),
+#   and every batch uses the same GanZhi dictionary, so it is written only once.
+# ------------------------------
+def arrow_schema(with_scores):
+    ganzhi = pa.dictionary(pa.int8(), pa.string())
+    fields = [("index", pa.int32()), ("error", pa.string())]
+    fields += [(field, ganzhi) for field in PILLAR_FIELDS]
+    fields += [("adjusted_to_true_solar_time", pa.string()), ("longitude", pa.float64()), ("tz_offset", pa.float64())]
+    if with_scores:
+        fields += [(f"score_{element}", pa.int8()) for element in ELEMENTS]
+    return pa.schema(fields)
+
+def _has_scores(rows):
+    return any(row.get("result") and "five_elements_scores" in row["result"] for row in rows)
+
+def _pillar_column(values):
+    indices = pa.array([None if value is None else _GANZHI_INDEX[value] for value in values], type=pa.int8())
+    return pa.DictionaryArray.from_arrays(indices, pa.array(GANZHI, type=pa.string()))
+
+def charts_to_arrow_batch(rows, schema):
+    results = [row.get("result") for row in rows]
+    pillars = [result["bazi"] if result else {} for result in results]
+    columns = [
+        pa.array([row["index"] for row in rows], type=pa.int32()),
+        pa.array([row.get("error") for row in rows], type=pa.string()),
+    ]
+    columns += [_pillar_column([p.get(field) for p in pillars]) for field in PILLAR_FIELDS]
+    columns += [
+        pa.array([p.get("adjusted_to_true_solar_time") for p in pillars], type=pa.string()),
+        pa.array([p.get("longitude") for p in pillars], type=pa.float64()),
+        pa.array([p.get("tz_offset") for p in pillars], type=pa.float64()),
+    ]
+    if schema.get_field_index("score_" + ELEMENTS[0]) >= 0:
+        for element in ELEMENTS:
+            columns.append(pa.array(
+                [result.get("five_elements_scores", {}).get(element) if result else None for result in results],
+                type=pa.int8()))
+    return pa.record_batch(columns, schema=schema)
+
+def charts_to_arrow(rows):
+    schema = arrow_schema(_has_scores(rows))
+    return pa.Table.from_batches([charts_to_arrow_batch(rows, schema)], schema=schema)
+
+class _ChunkSink:
+    # File-like target for the IPC writer; the caller drains the written bytes after each batch
+    def __init__(self):
+        self.chunks = []
+        self.closed = False
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+def iter_arrow_stream(rows, batch_rows=ARROW_BATCH_ROWS):
+    # Yields the IPC stream piece by piece: schema and dictionary, one message per batch, end marker
+    schema = arrow_schema(_has_scores(rows))
+    sink = _ChunkSink()
+    writer = pa.ipc.new_stream(sink, schema)
+    for start in range(0, len(rows), batch_rows):
+        writer.write_batch(charts_to_arrow_batch(rows[start:start + batch_rows], schema))
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+def arrow_stream_bytes(rows):
+    return b"".join(iter_arrow_stream(rows))
+
+class ArrowStreamResponse(StreamingResponse):
+    media_type = ARROW_STREAM
+
+    def __init__(self, rows, **kwargs):
+        super().__init__(iter_arrow_stream(rows), media_type=ARROW_STREAM, **kwargs)
@@ -0,0 +1,27 @@
+# fast_json.py
+#   JSON encoding for chart responses: orjson when it is installed, otherwise the
+#   stdlib json module with the same compact, non-ASCII-preserving output as
+#   Starlette's JSONResponse. Charts are plain dicts, lists, strings and numbers, so
+#   neither path needs FastAPI's jsonable_encoder walk over the structure first.
+import json
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # optional: pip install orjson
+    orjson = None
+
+def dumps_stdlib(content) -> bytes:
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+def dumps(content) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content)
+    return dumps_stdlib(content)
+
+class FastJSONResponse(JSONResponse):
+    # Returned directly from a handler, FastAPI sends it as is: no response-model
+    # validation and no jsonable_encoder pass
+    def render(self, content) -> bytes:
+        return dumps(content)
@@ -0,0 +1,65 @@
+# jieqi_table.py
+#   Precomputed solar-term (jieqi) instants for 1900-2100, shipped as jieqi.bin.
+#
+#   The file is a little-endian array('q') of seconds since 1970-01-01 00:00, read as
+#   naive China Standard Time wall-clock (the frame lunar_python reports terms in).
+#   Entries are chronological; for each year Y there are 24 entries in jqmc order
+#   (same ordering as ganzhi.jqmc), starting with the 冬至 of December Y-1. So entry i
+#   is the term JQMC[i % 24], and the odd positions are the 12 "jie" that switch the
+#   month pillar.
+#
+#   Rebuild after a lunar_python upgrade with: python jieqi_table.py
+import os
+import sys
+from array import array
+from datetime import datetime, timedelta
+
+JQMC = ("冬至", "小寒", "大寒", "立春", "雨水", "惊蛰", "春分", "清明", "谷雨", "立夏", "小满", "芒种",
+        "夏至", "小暑", "大暑", "立秋", "处暑", "白露", "秋分", "寒露", "霜降", "立冬", "小雪", "大雪")
+
+FIRST_YEAR = 1900
+LAST_YEAR = 2100
+TABLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "jieqi.bin")
+
+_EPOCH = datetime(1970, 1, 1)
+
+def to_epoch_seconds(dt: datetime) -> int:
+    return (dt - _EPOCH) // timedelta(seconds=1)
+
+def from_epoch_seconds(seconds: int) -> datetime:
+    return _EPOCH + timedelta(seconds=seconds)
+
+def build_table(first_year: int = FIRST_YEAR, last_year: int = LAST_YEAR) -> array:
+    # Make sure lunar_python is installed: pip install lunar_python
+    from lunar_python import Solar
+
+    table = array("q")
+    for year in range(first_year, last_year + 1):
+        # lunar year `year` names the 冬至 of December year-1 "冬至" and the rest of
+        # the solar year's terms by their own names
+        terms = Solar.fromYmd(year, 6, 1).getLunar().getJieQiTable()
+        for name in JQMC:
+            s = terms[name]
+            table.append(to_epoch_seconds(datetime(s.getYear(), s.getMonth(), s.getDay(), s.getHour(), s.getMinute(), s.getSecond())))
+    return table
+
+def write_table(path: str = TABLE_PATH):
+    table = build_table()
+    if sys.byteorder != "little":
+        table.byteswap()
+    with open(path, "wb") as f:
+        table.tofile(f)
+
+def load_table(path: str = TABLE_PATH) -> array:
+    table = array("q")
+    with open(path, "rb") as f:
+        table.frombytes(f.read())
+    if sys.byteorder != "little":
+        table.byteswap()
+    if len(table) != (LAST_YEAR - FIRST_YEAR + 1) * len(JQMC):
+        raise ValueError(f"{path}: expected {(LAST_YEAR - FIRST_YEAR + 1) * len(JQMC)} entries, found {len(table)}")
+    return table
+
+if __name__ == "__main__":
+    write_table()
+    print(f"wrote {TABLE_PATH}")
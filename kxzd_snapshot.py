@@ -0,0 +1,103 @@
+# kxzd_snapshot.py
+#   Precompiled binary snapshot of kxzd.csv (kxzd.bin), loaded with mmap so a cold
+#   start does not have to run csv.reader and int() over every row.
+#
+#   Build (part of the Docker/Render build): python kxzd_snapshot.py
+#
+#   Layout, all little-endian:
+#     header   magic b"KXZD", format version (u16), reserved (u16),
+#              sha256 of the source CSV bytes (32 bytes), crc32 of the payload (u32),
+#              character count, element count, bucket count, element-names byte length (u32 each)
+#     payload  element names   UTF-8, "\n"-separated, in element-code order
+#              characters      UTF-32-LE, one code point per character
+#              strokes         u8 per character
+#              element codes   u8 per character
+#              buckets         (element code, strokes, start, stop) as 4 x u32 each
+#   Columns are in CharacterDictionary order (element, strokes, character). A snapshot
+#   whose version, CSV checksum or payload checksum does not match is stale, and the
+#   caller falls back to parsing the CSV.
+import hashlib
+import mmap
+import os
+import struct
+import zlib
+
+MAGIC = b"KXZD"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<4sHH32sIIIII")
+
+def snapshot_path_for(csv_path):
+    return os.path.splitext(csv_path)[0] + ".bin"
+
+def csv_sha256(csv_path):
+    with open(csv_path, "rb") as f:
+        return hashlib.sha256(f.read()).digest()
+
+def write_snapshot(snapshot_path, csv_digest, elements, characters, strokes, element_codes, buckets):
+    # buckets: {(element, strokes): (start, stop)}
+    element_names = "\n".join(elements).encode("utf-8")
+    codes = {element: code for code, element in enumerate(elements)}
+    bucket_values = []
+    for (element, bucket_strokes), (start, stop) in buckets.items():
+        bucket_values.extend((codes[element], bucket_strokes, start, stop))
+
+    payload = b"".join((
+        element_names,
+        characters.encode("utf-32-le"),
+        bytes(strokes),
+        bytes(element_codes),
+        struct.pack(f"<{len(bucket_values)}I", *bucket_values),
+    ))
+    header = HEADER.pack(MAGIC, FORMAT_VERSION, 0, csv_digest, zlib.crc32(payload),
+                         len(characters), len(elements), len(buckets), len(element_names))
+    tmp_path = snapshot_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(header)
+        f.write(payload)
+    os.replace(tmp_path, snapshot_path)
+
+def read_snapshot(snapshot_path, csv_digest):
+    # Returns (elements, characters, strokes, element_codes, buckets), with strokes and
+    # element_codes as zero-copy memoryviews over the mapping, or None when the snapshot
+    # is missing or stale
+    try:
+        with open(snapshot_path, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (FileNotFoundError, ValueError):
+        return None
+    view = memoryview(mapped)
+    if len(view) < HEADER.size:
+        return None
+    magic, version, _, digest, crc, n_chars, n_elements, n_buckets, names_len = HEADER.unpack_from(view)
+    if magic != MAGIC or version != FORMAT_VERSION or digest != csv_digest:
+        return None
+    payload = view[HEADER.size:]
+    if len(payload) != names_len + n_chars * 6 + n_buckets * 16 or zlib.crc32(payload) != crc:
+        return None
+
+    offset = 0
+    def section(size):
+        nonlocal offset
+        offset += size
+        return payload[offset - size:offset]
+
+    elements = tuple(bytes(section(names_len)).decode("utf-8").split("\n")) if n_elements else ()
+    characters = bytes(section(n_chars * 4)).decode("utf-32-le")
+    strokes = section(n_chars)
+    element_codes = section(n_chars)
+    bucket_values = struct.unpack_from(f"<{n_buckets * 4}I", section(n_buckets * 16))
+    buckets = {}
+    for i in range(0, len(bucket_values), 4):
+        code, bucket_strokes, start, stop = bucket_values[i:i + 4]
+        buckets[(elements[code], bucket_strokes)] = (start, stop)
+    return elements, characters, strokes, element_codes, buckets
+
+if __name__ == "__main__":
+    from name_analyzer import CharacterDictionary
+
+    csv_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "kxzd.csv")
+    dictionary = CharacterDictionary.from_csv(csv_path)
+    snapshot_path = snapshot_path_for(csv_path)
+    write_snapshot(snapshot_path, csv_sha256(csv_path), dictionary.elements, dictionary.characters,
+                   dictionary.strokes, dictionary.element_codes, dictionary.buckets)
+    print(f"wrote {snapshot_path}")
@@ -1,11 +1,269 @@
 # name_analyzer.py
 
+import base64
+import copy
 import csv
+import heapq
+import os
+import threading
+from array import array
+from collections import namedtuple
+from collections.abc import Sequence
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice, product
+
+import kxzd_snapshot
+import name_catalog
+
+# ------------------------------
+# Character dictionary
+#   kxzd.csv (id, character, strokes, element) parsed once into compact columns:
+#   one string of characters, an array('B') of strokes and an array('B') of element
+#   codes, sorted by (element, strokes, character) so that every element and every
+#   (element, strokes) bucket is a contiguous index range. The whole dictionary is a
+#   few hundred KB and, being a handful of flat objects, stays shared copy-on-write
+#   across forked workers. Loaded dictionaries are kept per path and reloaded when the
+#   file's mtime changes; a matching kxzd.bin snapshot (see kxzd_snapshot.py) is
+#   memory-mapped instead of parsing the CSV.
+# ------------------------------
+class CharacterDictionary:
+    def __init__(self, csv_path, mtime_ns, elements, characters, strokes, element_codes, buckets, source='csv'):
+        self.csv_path = csv_path
+        self.mtime_ns = mtime_ns
+        self.source = source  # 'csv' or 'snapshot'
+        self.elements = elements
+        self.characters = characters
+        self.strokes = strokes
+        self.element_codes = element_codes
+        # (element, strokes) -> (start, stop), and the element -> (start, stop) ranges they make up
+        self.buckets = buckets
+        self.element_ranges = {}
+        for (element, _), (start, stop) in buckets.items():
+            first, last = self.element_ranges.get(element, (start, stop))
+            self.element_ranges[element] = (min(first, start), max(last, stop))
+        self.index = {character: i for i, character in enumerate(characters)}
+
+    @classmethod
+    def from_csv(cls, csv_path):
+        mtime_ns = os.stat(csv_path).st_mtime_ns
+        rows = []
+        elements = {}  # element name -> code, in order of first appearance
+
+        with open(csv_path, 'r', encoding='utf-8') as file:
+            csv_reader = csv.reader(file)
+            next(csv_reader)  # skip header
+            for row in csv_reader:
+                if len(row) >= 4:
+                    code = elements.setdefault(row[3], len(elements))
+                    rows.append((code, int(row[2]), row[1]))
+        rows.sort()
+
+        elements = tuple(elements)
+        buckets = {}
+        for i, (code, strokes, _) in enumerate(rows):
+            start, _ = buckets.get((elements[code], strokes), (i, i))
+            buckets[(elements[code], strokes)] = (start, i + 1)
+
+        return cls(csv_path, mtime_ns, elements,
+                   ''.join(character for _, _, character in rows),
+                   array('B', (strokes for _, strokes, _ in rows)),
+                   array('B', (code for code, _, _ in rows)),
+                   buckets)
+
+    @classmethod
+    def from_snapshot(cls, csv_path, snapshot_path=None):
+        # None when the snapshot is missing or does not match the CSV's current contents
+        mtime_ns = os.stat(csv_path).st_mtime_ns
+        sections = kxzd_snapshot.read_snapshot(
+            snapshot_path or kxzd_snapshot.snapshot_path_for(csv_path), kxzd_snapshot.csv_sha256(csv_path))
+        if sections is None:
+            return None
+        return cls(csv_path, mtime_ns, *sections, source='snapshot')
+
+    def entry(self, i):
+        return {
+            'character': self.characters[i],
+            'num': self.strokes[i],
+            'element': self.elements[self.element_codes[i]]
+        }
+
+    def characters_of(self, element):
+        start, stop = self.element_ranges.get(element, (0, 0))
+        return CharacterRun(self, start, stop)
+
+    def strokes_of(self, character):
+        i = self.index.get(character)
+        return self.strokes[i] if i is not None else None
+
+    def surname_strokes(self, surname):
+        # int for a single-character surname, a tuple per character for a compound one;
+        # None if the surname is empty or any of its characters is missing
+        strokes = tuple(self.strokes_of(character) for character in surname)
+        if not strokes or None in strokes:
+            return None
+        return strokes[0] if len(strokes) == 1 else strokes
+
+# ------------------------------
+# Character run
+#   Read-only sequence view over a contiguous range of a CharacterDictionary, sorted by
+#   strokes then character. Items are {'character', 'num', 'element'} dicts built on
+#   access, so per-query character lists cost nothing until names are produced.
+# ------------------------------
+class CharacterRun(Sequence):
+    __slots__ = ('dictionary', 'start', 'stop')
+
+    def __init__(self, dictionary, start, stop):
+        self.dictionary = dictionary
+        self.start = start
+        self.stop = stop
+
+    def __len__(self):
+        return self.stop - self.start
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return self.dictionary.entry(self.start + i)
+
+    def __iter__(self):
+        entry = self.dictionary.entry
+        for i in range(self.start, self.stop):
+            yield entry(i)
+
+    def stroke_counts(self):
+        return self.dictionary.strokes[self.start:self.stop]
+
+    def stroke_runs(self):
+        # strokes -> CharacterRun, ascending by strokes (bucket ranges, no scan of characters)
+        runs = {}
+        strokes = self.dictionary.strokes
+        i = self.start
+        while i < self.stop:
+            element = self.dictionary.elements[self.dictionary.element_codes[i]]
+            _, stop = self.dictionary.buckets[(element, strokes[i])]
+            stop = min(stop, self.stop)
+            runs[strokes[i]] = CharacterRun(self.dictionary, i, stop)
+            i = stop
+        return runs
+
+_dictionaries = {}
+_dictionaries_lock = threading.Lock()
+
+def load_character_dictionary(csv_path):
+    key = os.path.abspath(csv_path)
+    mtime_ns = os.stat(key).st_mtime_ns
+    dictionary = _dictionaries.get(key)
+    if dictionary is None or dictionary.mtime_ns != mtime_ns:
+        with _dictionaries_lock:
+            dictionary = _dictionaries.get(key)
+            if dictionary is None or dictionary.mtime_ns != mtime_ns:
+                dictionary = CharacterDictionary.from_snapshot(key) or CharacterDictionary.from_csv(key)
+                _dictionaries[key] = dictionary
+    return dictionary
+
+# ------------------------------
+# Pagination cursors
+#   An opaque, URL-safe token wrapping the offset of the next combination.
+# ------------------------------
+def encode_cursor(offset):
+    return base64.urlsafe_b64encode(f"o:{offset}".encode('ascii')).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor):
+    if not cursor:
+        return 0
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        prefix, offset = base64.urlsafe_b64decode(padded.encode('ascii')).decode('ascii').split(':')
+        offset = int(offset)
+    except (ValueError, UnicodeError):
+        raise ValueError(f"invalid cursor: {cursor!r}")
+    if prefix != 'o' or offset < 0:
+        raise ValueError(f"invalid cursor: {cursor!r}")
+    return offset
+
+# ------------------------------
+# Helpers over character lists
+#   Accept CharacterRun views (fast path: read the strokes column / bucket ranges) or
+#   plain lists of {'character', 'num', 'element'} dicts.
+# ------------------------------
+def _stroke_counts(chars):
+    if isinstance(chars, CharacterRun):
+        return chars.stroke_counts()
+    return [int(char['num']) for char in chars]
+
+def _stroke_groups(chars):
+    if isinstance(chars, CharacterRun):
+        return chars.stroke_runs()
+    groups = {}
+    for char in chars:
+        groups.setdefault(int(char['num']), []).append(char)
+    return groups
+
+# ------------------------------
+# Surname terms of the five grids
+#   Single surname s:           tian = s + 1,        ren = s + n1,    wai = n2 + 1
+#   Compound surname s1..sk:    tian = s1 + ... + sk, ren = sk + n1,   wai = s1 + n2
+#   di is n1 + n2 and zong is the sum of all strokes. For one-character names di is
+#   n1 + 1 and wai is s + 1 (single surname) or s1 + 1 (compound surname).
+#   SurnameGrid holds the surname's share of each: tian and single_wai are complete
+#   sums, ren / wai / zong still need the name's strokes added.
+# ------------------------------
+SurnameGrid = namedtuple("SurnameGrid", ["tian", "ren", "wai", "zong", "single_wai"])
+
+def normalize_surname_strokes(surname_strokes):
+    # int for a single surname; a tuple of two or more ints for a compound surname
+    if isinstance(surname_strokes, (tuple, list)):
+        if len(surname_strokes) == 1:
+            return int(surname_strokes[0])
+        return tuple(int(n) for n in surname_strokes)
+    return int(surname_strokes)
+
+def surname_grid(surname_strokes):
+    surname_strokes = normalize_surname_strokes(surname_strokes)
+    if isinstance(surname_strokes, int):
+        return SurnameGrid(surname_strokes + 1, surname_strokes, 1, surname_strokes, surname_strokes + 1)
+    total = sum(surname_strokes)
+    return SurnameGrid(total, surname_strokes[-1], surname_strokes[0], total, surname_strokes[0] + 1)
+
+def _two_character_name(char1, char2, char1_num, structure):
+    return {
+        'name': char1['character'] + char2['character'],
+        'structure': structure,
+        'elements': [char1['element'], char2['element']],
+        'strokes': [char1_num, int(char2['num'])]
+    }
+
+def rules_only(analyzer):
+    # The analyzer without its catalog: what process-pool tasks compute with (small to pickle)
+    if analyzer.catalog is None:
+        return analyzer
+    clone = copy.copy(analyzer)
+    clone.catalog = None
+    return clone
+
+def _two_character_partition(partition):
+    # Process-pool task: the lucky stroke pairs of one (el1, el2) element pair
+    analyzer, surname_strokes, strokes1, strokes2 = partition
+    return analyzer.lucky_two_character_strokes(surname_strokes, strokes1, strokes2)
 
 class NameAnalyzer:
+    # Name score: weight per lucky ge (tian, ren, di, wai, zong), plus a bonus for each
+    # name character whose element is one of the chart's weak elements
+    GE_WEIGHTS = (1, 3, 2, 1, 3)
+    WEAK_ELEMENT_WEIGHT = 4
+    # Stroke sums covered by the lookup tables up front: three one-byte stroke counts
+    MAX_STROKE_SUM = 3 * 255
+
     def __init__(self):
         self.lucky_numbers = {1, 3, 5, 6, 7, 8, 11, 13, 15, 16, 17, 18, 21, 23, 24, 25, 29, 31, 32, 33,
                               35, 37, 39, 41, 45, 47, 48, 52, 57, 61, 63, 65, 67, 68, 81}
+        self.structure_table = self.lucky_table = b''
+        self.sum_tables(self.MAX_STROKE_SUM)
+        self.catalog = None  # name_catalog.NameCatalog once load_catalog succeeds
 
     def calculate_structure(self, strokes):
         return strokes % 81
@@ -13,74 +271,285 @@ class NameAnalyzer:
     def is_lucky(self, num):
         return num in self.lucky_numbers
 
-    def get_best_characters(self, best_elements, csv_path, surname):
-        result = {element: [] for element in best_elements}
-        surname_strokes = None
+    # ------------------------------
+    # Stroke-sum lookup tables
+    #   structure_table[n] == calculate_structure(n) and lucky_table[n] ==
+    #   is_lucky(calculate_structure(n)) for every stroke sum n, so the inner loops index
+    #   two bytes objects instead of making a modulo and a set lookup method call per ge.
+    #   Returns (structure_table, lucky_table), grown first if max_sum is not covered.
+    # ------------------------------
+    def sum_tables(self, max_sum):
+        if max_sum >= len(self.structure_table):
+            self.structure_table = bytes(self.calculate_structure(n) for n in range(max_sum + 1))
+            self.lucky_table = bytes(self.is_lucky(structure) for structure in self.structure_table)
+        return self.structure_table, self.lucky_table
 
-        with open(csv_path, 'r', encoding='utf-8') as file:
-            csv_reader = csv.reader(file)
-            next(csv_reader)  # skip header
-            for row in csv_reader:
-                if len(row) >= 4:
-                    element = row[3]
-                    if element in best_elements:
-                        result[element].append({
-                            'character': row[1],
-                            'num': int(row[2]),
-                            'element': row[3]
-                        })
-                    if row[1] == surname:
-                        surname_strokes = int(row[2])
-
-        # sort characters by strokes then name
-        for element in result:
-            result[element] = sorted(result[element], key=lambda x: (x['num'], x['character']))
+    # ------------------------------
+    # Precomputed catalog
+    #   Loads name_catalog.bin (see name_catalog.py) if it was built under this
+    #   analyzer's lucky numbers; the stroke searches below then become lookups for
+    #   every surname and character stroke count the catalog covers. Returns whether a
+    #   catalog is in use.
+    # ------------------------------
+    def load_catalog(self, path=name_catalog.CATALOG_PATH):
+        self.catalog = name_catalog.read_catalog(path, name_catalog.rules_digest(self))
+        return self.catalog is not None
+
+    def _catalog_covers(self, surname_strokes, *stroke_sets):
+        # the catalog is keyed by single-surname stroke counts; compound surnames are
+        # always computed from the tables
+        catalog = self.catalog
+        return (catalog is not None and isinstance(surname_strokes, int) and 0 < surname_strokes <= catalog.max_strokes
+                and all(0 < n <= catalog.max_strokes for strokes in stroke_sets for n in strokes))
+
+    # ------------------------------
+    # Lucky strokes for one-character names
+    #   Returns {strokes: (tian, ren, di, wai, zong)} for the stroke counts whose five
+    #   ge are all lucky, given the surname's strokes (int, or a tuple for a compound
+    #   surname; see surname_grid).
+    # ------------------------------
+    def lucky_one_character_strokes(self, surname_strokes, strokes):
+        surname_strokes = normalize_surname_strokes(surname_strokes)
+        if self._catalog_covers(surname_strokes, strokes):
+            row = self.catalog.singles[surname_strokes]
+            return {n: row[n] for n in strokes if n in row}
 
+        grid = surname_grid(surname_strokes)
+        ge, lucky = self.sum_tables(max(grid.tian, grid.single_wai, grid.ren, grid.zong) + 1 + max(strokes, default=0))
+        result = {}
+        if lucky[grid.tian] and lucky[grid.single_wai]:
+            tian_ge, wai_ge = ge[grid.tian], ge[grid.single_wai]
+            for n in strokes:
+                if lucky[grid.ren + n] and lucky[n + 1] and lucky[grid.zong + n]:
+                    result[n] = (tian_ge, ge[grid.ren + n], ge[n + 1], wai_ge, ge[grid.zong + n])
+        return result
+
+    # ------------------------------
+    # Lucky stroke pairs for two-character names
+    #   Returns {stroke1: {stroke2: (tian, ren, di, wai, zong)}} for the pairs whose
+    #   ren/di/wai ge are all lucky, given the surname's strokes (int, or a tuple for a
+    #   compound surname).
+    # ------------------------------
+    def lucky_two_character_strokes(self, surname_strokes, strokes1, strokes2):
+        surname_strokes = normalize_surname_strokes(surname_strokes)
+        if self._catalog_covers(surname_strokes, strokes1, strokes2):
+            rows = self.catalog.pairs[surname_strokes]
+            pairs = {}
+            for n1 in strokes1:
+                row = rows.get(n1)
+                if row:
+                    matched = {n2: row[n2] for n2 in strokes2 if n2 in row}
+                    if matched:
+                        pairs[n1] = matched
+            return pairs
+
+        grid = surname_grid(surname_strokes)
+        ge, lucky = self.sum_tables(max(grid.tian, grid.ren, grid.wai, grid.zong) + 1
+                                    + max(strokes1, default=0) + max(strokes2, default=0))
+        tian_ge = ge[grid.tian]
+        pairs = {}
+        for n1 in strokes1:
+            if not lucky[grid.ren + n1]:
+                continue
+            ren_ge = ge[grid.ren + n1]
+            for n2 in strokes2:
+                if lucky[n1 + n2] and lucky[grid.wai + n2]:
+                    pairs.setdefault(n1, {})[n2] = (tian_ge, ren_ge, ge[n1 + n2], ge[grid.wai + n2],
+                                                    ge[grid.zong + n1 + n2])
+        return pairs
+
+    def get_best_characters(self, best_elements, csv_path, surname):
+        dictionary = load_character_dictionary(csv_path)
+        # characters come pre-sorted by strokes then name, as read-only CharacterRun views
+        result = {element: dictionary.characters_of(element) for element in best_elements}
+        surname_strokes = dictionary.surname_strokes(surname)
         return result, surname_strokes
 
-    def calculate_san_cai_wu_ge(self, character_data, surname_strokes, desired_element=None):
-        auspicious_combinations = []
+    def calculate_san_cai_wu_ge(self, character_data, surname_strokes, desired_element=None, workers=None):
+        # workers > 1 splits the two-character search across a process pool (see below)
+        if workers is not None and workers > 1:
+            return self._calculate_san_cai_wu_ge_parallel(character_data, surname_strokes, desired_element, workers)
+        return list(self.iter_san_cai_wu_ge(character_data, surname_strokes, desired_element))
 
-        # single character names
+    # ------------------------------
+    # Lazy enumeration
+    #   Yields the same combinations, in the same order, as calculate_san_cai_wu_ge.
+    #   The first `start` combinations are skipped without being built (whole char2
+    #   runs at a time), so deep pages cost little more than shallow ones.
+    # ------------------------------
+    def iter_san_cai_wu_ge(self, character_data, surname_strokes, desired_element=None, start=0):
+        surname_strokes = normalize_surname_strokes(surname_strokes)
+        for name in self._single_character_names(character_data, surname_strokes, desired_element):
+            if start:
+                start -= 1
+                continue
+            yield name
+
+        for el1, chars1 in character_data.items():
+            for el2, chars2 in character_data.items():
+                if desired_element and (el1 != desired_element or el2 != desired_element):
+                    continue
+                for i, char1_num, matches in self._two_character_matches(surname_strokes, chars1, chars2):
+                    if start >= len(matches):
+                        start -= len(matches)
+                        continue
+                    char1 = chars1[i]
+                    for j, structure in matches[start:]:
+                        yield _two_character_name(char1, chars2[j], char1_num, structure)
+                    start = 0
+
+    def _single_character_names(self, character_data, surname_strokes, desired_element=None):
         for element, chars in character_data.items():
             if desired_element and element != desired_element:
                 continue
+            lucky_strokes = self.lucky_one_character_strokes(surname_strokes, set(_stroke_counts(chars)))
             for char in chars:
-                surname_num = int(surname_strokes)
                 char_num = int(char['num'])
-                tian_ge = self.calculate_structure(surname_num + 1)
-                ren_ge = self.calculate_structure(surname_num + char_num)
-                di_ge = self.calculate_structure(char_num + 1)
-                wai_ge = self.calculate_structure(surname_num + 1)
-                zong_ge = self.calculate_structure(surname_num + char_num)
-                if all(self.is_lucky(x) for x in [tian_ge, ren_ge, di_ge, wai_ge, zong_ge]):
-                    auspicious_combinations.append({
+                structure = lucky_strokes.get(char_num)
+                if structure:
+                    yield {
                         'name': char['character'],
-                        'structure': (tian_ge, ren_ge, di_ge, wai_ge, zong_ge),
+                        'structure': structure,
                         'elements': [char['element']],
                         'strokes': [char_num]
-                    })
+                    }
 
-        # two-character names
-        for el1, chars1 in character_data.items():
-            for el2, chars2 in character_data.items():
+    # ------------------------------
+    # Two-character matches for one (el1, el2) element pair
+    #   The luck test only depends on the stroke counts, so lucky (stroke1, stroke2)
+    #   pairs are found first over the few dozen distinct counts and then expanded to
+    #   characters. Yields (char1 index, char1 strokes, [(char2 index, structure)]) for
+    #   every char1 with at least one lucky partner; output order is the same as a
+    #   plain char1 x char2 scan.
+    # ------------------------------
+    def _two_character_matches(self, surname_strokes, chars1, chars2, lucky_pairs=None):
+        strokes1 = _stroke_counts(chars1)
+        strokes2 = _stroke_counts(chars2)
+        if lucky_pairs is None:
+            lucky_pairs = self.lucky_two_character_strokes(surname_strokes, set(strokes1), set(strokes2))
+        matches_by_stroke = {}  # char1 strokes -> [(char2 index, structure)] in chars2 order
+        for i, char1_num in enumerate(strokes1):
+            structures = lucky_pairs.get(char1_num)
+            if not structures:
+                continue
+            matches = matches_by_stroke.get(char1_num)
+            if matches is None:
+                matches = [(j, structures[char2_num]) for j, char2_num in enumerate(strokes2)
+                           if char2_num in structures]
+                matches_by_stroke[char1_num] = matches
+            yield i, char1_num, matches
+
+    # ------------------------------
+    # Parallel enumeration
+    #   Each (el1, el2) pair of the two-character search is one process-pool task that
+    #   only finds the lucky (stroke1, stroke2) pairs: stroke counts go out, a small
+    #   {stroke1: {stroke2: structure}} dict comes back. The names themselves are built
+    #   in this process, in pool.map submission order, so the list is identical to the
+    #   sequential one. Sending name dicts back would cost more to unpickle than the
+    #   whole sequential search, so the pool only pays off where the stroke search
+    #   dominates (no catalog, many distinct stroke counts).
+    # ------------------------------
+    def _calculate_san_cai_wu_ge_parallel(self, character_data, surname_strokes, desired_element, workers):
+        surname_strokes = normalize_surname_strokes(surname_strokes)
+        names = list(self._single_character_names(character_data, surname_strokes, desired_element))
+        element_pairs = [(chars1, chars2)
+                         for el1, chars1 in character_data.items()
+                         for el2, chars2 in character_data.items()
+                         if not desired_element or (el1 == desired_element and el2 == desired_element)]
+        analyzer = rules_only(self)
+        partitions = [(analyzer, surname_strokes, set(_stroke_counts(chars1)), set(_stroke_counts(chars2)))
+                      for chars1, chars2 in element_pairs]
+        with ProcessPoolExecutor(max_workers=min(workers, len(partitions) or 1)) as pool:
+            lucky_pairs = list(pool.map(_two_character_partition, partitions))
+        for (chars1, chars2), pairs in zip(element_pairs, lucky_pairs):
+            for i, char1_num, matches in self._two_character_matches(surname_strokes, chars1, chars2, pairs):
+                char1 = chars1[i]
+                names.extend(_two_character_name(char1, chars2[j], char1_num, structure) for j, structure in matches)
+        return names
+
+    # ------------------------------
+    # Cursor pagination
+    #   cursor: opaque token from a previous page's next_cursor (None for the first page).
+    #   Returns {'items': [...at most limit...], 'next_cursor': token or None}; only one
+    #   page of combinations is ever built.
+    # ------------------------------
+    def page_san_cai_wu_ge(self, character_data, surname_strokes, desired_element=None, cursor=None, limit=50):
+        if limit < 1:
+            raise ValueError("limit must be at least 1")
+        offset = decode_cursor(cursor)
+        combinations = self.iter_san_cai_wu_ge(character_data, surname_strokes, desired_element, start=offset)
+        items = list(islice(combinations, limit + 1))
+        next_cursor = encode_cursor(offset + limit) if len(items) > limit else None
+        return {'items': items[:limit], 'next_cursor': next_cursor}
+
+    # ------------------------------
+    # Scoring & top-k selection
+    # ------------------------------
+    def score_name(self, structure, elements, weak_elements=()):
+        score = sum(weight for weight, ge in zip(self.GE_WEIGHTS, structure) if self.is_lucky(ge))
+        score += self.WEAK_ELEMENT_WEIGHT * sum(1 for element in elements if element in weak_elements)
+        return score
+
+    def _name_buckets(self, character_data, surname_strokes, desired_element=None):
+        # (element names, structure, [chars per position]) for every group of combinations
+        # sharing elements and strokes, in iter_san_cai_wu_ge order; all names in a
+        # bucket have the same structure and therefore the same score
+        surname_strokes = normalize_surname_strokes(surname_strokes)
+        by_stroke = {element: _stroke_groups(chars) for element, chars in character_data.items()}
+
+        for element, groups in by_stroke.items():
+            if desired_element and element != desired_element:
+                continue
+            lucky_strokes = self.lucky_one_character_strokes(surname_strokes, groups)
+            for char_num, chars in groups.items():
+                structure = lucky_strokes.get(char_num)
+                if structure:
+                    yield (element,), structure, (chars,)
+
+        for el1, groups1 in by_stroke.items():
+            for el2, groups2 in by_stroke.items():
                 if desired_element and (el1 != desired_element or el2 != desired_element):
                     continue
-                for char1 in chars1:
-                    for char2 in chars2:
-                        surname_num = int(surname_strokes)
-                        char1_num = int(char1['num'])
-                        char2_num = int(char2['num'])
-                        tian_ge = self.calculate_structure(surname_num + 1)
-                        ren_ge = self.calculate_structure(surname_num + char1_num)
-                        di_ge = self.calculate_structure(char1_num + char2_num)
-                        wai_ge = self.calculate_structure(char2_num + 1)
-                        zong_ge = self.calculate_structure(surname_num + char1_num + char2_num)
-                        if all(self.is_lucky(x) for x in [ren_ge, di_ge, wai_ge]):
-                            auspicious_combinations.append({
-                                'name': char1['character'] + char2['character'],
-                                'structure': (tian_ge, ren_ge, di_ge, wai_ge, zong_ge),
-                                'elements': [char1['element'], char2['element']],
-                                'strokes': [char1_num, char2_num]
-                            })
-        return auspicious_combinations
+                lucky_pairs = self.lucky_two_character_strokes(surname_strokes, groups1, groups2)
+                for n1, structures in lucky_pairs.items():
+                    for n2, structure in structures.items():
+                        yield (el1, el2), structure, (groups1[n1], groups2[n2])
+
+    # ------------------------------
+    # Top-k names
+    #   Best k combinations by score_name (ties: earlier bucket first), each with a
+    #   'score' key. Buckets are scored once and visited best-first; a bounded min-heap
+    #   holds the current top k, and once the next bucket cannot beat its k-th best the
+    #   remaining buckets are pruned without building any of their names.
+    # ------------------------------
+    def top_k_names(self, character_data, surname_strokes, weak_elements=(), k=50, desired_element=None):
+        if k < 1:
+            return []
+        weak_elements = set(weak_elements)
+        buckets = [(self.score_name(structure, elements, weak_elements), order, structure, positions)
+                   for order, (elements, structure, positions)
+                   in enumerate(self._name_buckets(character_data, surname_strokes, desired_element))]
+        buckets.sort(key=lambda bucket: (-bucket[0], bucket[1]))
+
+        heap = []  # (score, -seq, name); heap[0] is the current k-th best
+        seq = 0
+        for score, _, structure, positions in buckets:
+            if len(heap) == k and score <= heap[0][0]:
+                break
+            for chars in product(*positions):
+                seq += 1
+                if len(heap) == k and (score, -seq) <= heap[0][:2]:
+                    break
+                name = {
+                    'name': ''.join(char['character'] for char in chars),
+                    'structure': structure,
+                    'elements': [char['element'] for char in chars],
+                    'strokes': [int(char['num']) for char in chars],
+                    'score': score
+                }
+                if len(heap) < k:
+                    heapq.heappush(heap, (score, -seq, name))
+                else:
+                    heapq.heapreplace(heap, (score, -seq, name))
+
+        return [name for _, _, name in sorted(heap, key=lambda entry: (-entry[0], -entry[1]))]
@@ -0,0 +1,117 @@
+# name_catalog.py
+#   Precomputed name catalog (name_catalog.bin). Which one- and two-character stroke
+#   combinations make a lucky name depends only on the surname's stroke count, never
+#   on the characters themselves, so for every surname stroke count up to the
+#   dictionary's maximum the catalog stores the lucky stroke counts (one-character
+#   names) and the lucky (stroke1, stroke2) pairs (two-character names) with their
+#   structures. With it loaded, NameAnalyzer answers those searches with dict lookups.
+#
+#   Build (part of the Docker/Render build, after kxzd_snapshot.py): python name_catalog.py
+#   Surname stroke counts are independent, so the build runs one process-pool task per
+#   surname stroke count across all cores (see build_catalog).
+#
+#   Layout, all little-endian:
+#     header   magic b"NCAT", format version (u16), max strokes (u16),
+#              sha256 of the analyzer's stroke-sum tables (32 bytes), crc32 of the
+#              payload (u32), entry count (u32)
+#     payload  entries of 8 x u8: surname strokes, stroke1, stroke2 (0 for a
+#              one-character name), tian, ren, di, wai, zong ge
+#   A catalog built under different lucky numbers (table digest mismatch), or whose
+#   version or payload checksum does not match, is stale and ignored.
+import hashlib
+import os
+import struct
+import zlib
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+MAGIC = b"NCAT"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<4sHH32sII")
+ENTRY = struct.Struct("<8B")
+CATALOG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "name_catalog.bin")
+
+NameCatalog = namedtuple("NameCatalog", [
+    "max_strokes",   # surname and character stroke counts 1..max_strokes are covered
+    "singles",       # surname strokes -> {strokes: structure}
+    "pairs"          # surname strokes -> {stroke1: {stroke2: structure}}
+])
+
+def rules_digest(analyzer):
+    structure_table, lucky_table = analyzer.sum_tables(analyzer.MAX_STROKE_SUM)
+    return hashlib.sha256(structure_table[:analyzer.MAX_STROKE_SUM + 1] + lucky_table[:analyzer.MAX_STROKE_SUM + 1]).digest()
+
+def _catalog_rows(task):
+    # One surname stroke count: (singles row, pairs row), computed from the rules
+    analyzer, surname_strokes, max_strokes = task
+    strokes = range(1, max_strokes + 1)
+    return (analyzer.lucky_one_character_strokes(surname_strokes, strokes),
+            analyzer.lucky_two_character_strokes(surname_strokes, strokes, strokes))
+
+def build_catalog(analyzer, max_strokes, workers=None):
+    # Entries are always computed from the rules, even if analyzer has a catalog loaded.
+    # workers: process-pool size (default: CPU count); 1 builds in this process.
+    from name_analyzer import rules_only
+
+    workers = workers or os.cpu_count() or 1
+    tasks = [(rules_only(analyzer), surname_strokes, max_strokes) for surname_strokes in range(1, max_strokes + 1)]
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks) or 1)) as pool:
+            rows = list(pool.map(_catalog_rows, tasks))
+    else:
+        rows = [_catalog_rows(task) for task in tasks]
+    singles = {task[1]: row[0] for task, row in zip(tasks, rows)}
+    pairs = {task[1]: row[1] for task, row in zip(tasks, rows)}
+    return NameCatalog(max_strokes, singles, pairs)
+
+def write_catalog(path, digest, catalog):
+    entries = []
+    for surname_strokes, structures in catalog.singles.items():
+        for n, structure in structures.items():
+            entries.append(ENTRY.pack(surname_strokes, n, 0, *structure))
+    for surname_strokes, rows in catalog.pairs.items():
+        for n1, structures in rows.items():
+            for n2, structure in structures.items():
+                entries.append(ENTRY.pack(surname_strokes, n1, n2, *structure))
+    payload = b"".join(entries)
+    header = HEADER.pack(MAGIC, FORMAT_VERSION, catalog.max_strokes, digest, zlib.crc32(payload), len(entries))
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(header)
+        f.write(payload)
+    os.replace(tmp_path, path)
+
+def read_catalog(path, digest):
+    # NameCatalog, or None when the file is missing or stale
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except FileNotFoundError:
+        return None
+    if len(data) < HEADER.size:
+        return None
+    magic, version, max_strokes, file_digest, crc, count = HEADER.unpack_from(data)
+    payload = memoryview(data)[HEADER.size:]
+    if magic != MAGIC or version != FORMAT_VERSION or file_digest != digest:
+        return None
+    if len(payload) != count * ENTRY.size or zlib.crc32(payload) != crc:
+        return None
+
+    singles = {s: {} for s in range(1, max_strokes + 1)}
+    pairs = {s: {} for s in range(1, max_strokes + 1)}
+    for surname_strokes, n1, n2, *structure in ENTRY.iter_unpack(payload):
+        if n2:
+            pairs[surname_strokes].setdefault(n1, {})[n2] = tuple(structure)
+        else:
+            singles[surname_strokes][n1] = tuple(structure)
+    return NameCatalog(max_strokes, singles, pairs)
+
+if __name__ == "__main__":
+    from name_analyzer import NameAnalyzer, load_character_dictionary
+
+    csv_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "kxzd.csv")
+    dictionary = load_character_dictionary(csv_path)
+    analyzer = NameAnalyzer()
+    max_strokes = max(dictionary.strokes)
+    write_catalog(CATALOG_PATH, rules_digest(analyzer), build_catalog(analyzer, max_strokes))
+    print(f"wrote {CATALOG_PATH} (strokes 1-{max_strokes})")
@@ -0,0 +1,56 @@
+# name_vectorized.py
+#   NumPy versions of NameAnalyzer's stroke-sum checks: structure values and lucky
+#   flags for whole vectors of stroke sums at once, and the lucky (stroke1, stroke2)
+#   search of lucky_two_character_strokes as one broadcast over all pairs. Uses the
+#   same lookup tables as NameAnalyzer.sum_tables, so results agree exactly.
+#
+#   Requires numpy (offline catalog work only, not needed by the API): pip install numpy
+import numpy as np
+
+from name_analyzer import NameAnalyzer, surname_grid
+
+def sum_tables(analyzer=None, max_sum=NameAnalyzer.MAX_STROKE_SUM):
+    # (structure, lucky) as uint8 / bool arrays indexed by stroke sum
+    analyzer = analyzer or NameAnalyzer()
+    structure_table, lucky_table = analyzer.sum_tables(max_sum)
+    return np.frombuffer(structure_table, dtype=np.uint8), np.frombuffer(lucky_table, dtype=np.bool_)
+
+def evaluate_sums(sums, analyzer=None):
+    # Structure values and lucky flags for an array of stroke sums
+    sums = np.asarray(sums, dtype=np.int64)
+    structure, lucky = sum_tables(analyzer, int(sums.max(initial=0)))
+    return structure[sums], lucky[sums]
+
+# ------------------------------
+# Lucky stroke pairs for two-character names
+#   Vectorized lucky_two_character_strokes: evaluates the ren/di/wai ge of every
+#   (stroke1, stroke2) combination in one go; surname_strokes is an int, or a tuple
+#   for a compound surname. Returns (n1, n2, structures), with
+#   structures an N x 5 uint8 matrix of (tian, ren, di, wai, zong) per lucky pair, rows
+#   ordered by stroke1 then stroke2 as given.
+# ------------------------------
+def lucky_two_character_strokes(surname_strokes, strokes1, strokes2, analyzer=None):
+    grid = surname_grid(surname_strokes)
+    n1 = np.asarray(list(strokes1), dtype=np.int64)[:, None]
+    n2 = np.asarray(list(strokes2), dtype=np.int64)[None, :]
+    structure, lucky = sum_tables(analyzer, max(grid.tian, grid.ren, grid.wai, grid.zong) + 1
+                                  + int(n1.max(initial=0)) + int(n2.max(initial=0)))
+
+    mask = lucky[grid.ren + n1] & lucky[n1 + n2] & lucky[grid.wai + n2]
+    rows, cols = np.nonzero(mask)
+    n1, n2 = n1[rows, 0], n2[0, cols]
+    structures = np.stack([
+        np.full(n1.shape, structure[grid.tian], dtype=np.uint8),
+        structure[grid.ren + n1],
+        structure[n1 + n2],
+        structure[grid.wai + n2],
+        structure[grid.zong + n1 + n2],
+    ], axis=1)
+    return n1, n2, structures
+
+def as_pairs(n1, n2, structures):
+    # The {stroke1: {stroke2: structure}} form returned by NameAnalyzer
+    pairs = {}
+    for a, b, row in zip(n1.tolist(), n2.tolist(), structures.tolist()):
+        pairs.setdefault(a, {})[b] = tuple(row)
+    return pairs
@@ -0,0 +1,184 @@
+# pillar_engine.py
+#   Pure-arithmetic GanZhi (four pillars) engine. Produces the same year/month/day/hour
+#   pillar strings as lunar_python's EightChar (default sect 2) without building the
+#   Solar -> Lunar -> EightChar object chain per call.
+#
+#   - Day pillar: Julian day number modulo 10 / 12.
+#   - Hour pillar: day stem plus hour branch (five-rat rule).
+#   - Year and month pillars: which "jie" solar term the instant falls after, found by
+#     bisecting the precomputed 1900-2100 table in jieqi.bin (see jieqi_table.py).
+#     Outside that range the jie instants of a year are taken from lunar_python once per
+#     year and kept in memory, so lunar_python is only the verification oracle and a
+#     one-off data source.
+#
+#   Run `python pillar_engine.py [start_year end_year]` for the differential check
+#   against lunar_python (default 1901-2100); test_pillar_engine.py runs it under pytest.
+import random
+import sys
+import threading
+from bisect import bisect_right
+from collections import namedtuple
+from datetime import date, datetime, timedelta
+
+# Make sure lunar_python is installed: pip install lunar_python
+from lunar_python import Solar
+
+import jieqi_table
+
+GAN = "甲乙丙丁戊己庚辛壬癸"
+ZHI = "子丑寅卯辰巳午未申酉戌亥"
+
+# The 12 "jie" solar terms in calendar order; month and year pillars switch at these
+# instants. 小寒 (early January) still belongs to the previous GanZhi year.
+JIE_NAMES = ("小寒", "立春", "惊蛰", "清明", "立夏", "芒种", "小暑", "立秋", "白露", "寒露", "立冬", "大雪")
+
+# Julian day number of 0001-01-01 (proleptic Gregorian) minus one, for date.toordinal()
+_JDN_ORDINAL_OFFSET = 1721425
+
+# ------------------------------
+# Day-level pillars
+#   EightChar uses lunar_python's default sect 2: the late Zi hour (23:00-23:59) keeps
+#   the current day's day pillar, but its hour stem is counted from the next day's stem.
+#   Year and month pillars switch at the exact instant of a jie, of which there is at
+#   most one per day.
+# ------------------------------
+DayPillars = namedtuple("DayPillars", [
+    "year_pillar", "month_pillar",   # in effect from 00:00
+    "day_pillar", "day_gan_index",
+    "boundary",                      # datetime of the jie falling on this day, or None
+    "year_after", "month_after"      # in effect from the boundary onwards
+])
+
+# Loaded once at import (~40 KB, well under a millisecond)
+JIEQI_TABLE = jieqi_table.load_table()
+
+_jie_instants = {}  # solar year -> tuple of 12 datetimes, ordered as JIE_NAMES
+_jie_lock = threading.Lock()
+
+def jie_instants(year: int):
+    instants = _jie_instants.get(year)
+    if instants is None:
+        # lunar year `year` spans the whole solar year's jie terms by name
+        table = Solar.fromYmd(year, 6, 1).getLunar().getJieQiTable()
+        instants = tuple(
+            datetime(s.getYear(), s.getMonth(), s.getDay(), s.getHour(), s.getMinute(), s.getSecond())
+            for s in (table[name] for name in JIE_NAMES)
+        )
+        with _jie_lock:
+            _jie_instants[year] = instants
+    return instants
+
+def _year_month_pillars(ganzhi_year: int, month_index: int):
+    # month_index 0 is the 寅 month starting at 立春; stems follow the five-tiger rule
+    year_pillar = GAN[(ganzhi_year - 4) % 10] + ZHI[(ganzhi_year - 4) % 12]
+    month_pillar = GAN[((ganzhi_year - 4) % 5 * 2 + 2 + month_index) % 10] + ZHI[(2 + month_index) % 12]
+    return year_pillar, month_pillar
+
+def _year_month_after_jie(year: int, jie_index: int):
+    # jie_index follows JIE_NAMES; -1 means "before this year's 小寒" (still 大雪 month)
+    if jie_index <= 0:
+        return _year_month_pillars(year - 1, 11 + jie_index)
+    return _year_month_pillars(year, jie_index - 1)
+
+def _year_month_for_jie_position(position: int):
+    # position is an odd index into JIEQI_TABLE; the first jie there (position 1) is
+    # the 小寒 of FIRST_YEAR, which still belongs to GanZhi year FIRST_YEAR - 1
+    jie_count = (position - 1) // 2
+    return _year_month_pillars(jieqi_table.FIRST_YEAR - 1 + (jie_count + 11) // 12, (jie_count - 1) % 12)
+
+def day_pillars(d: date) -> DayPillars:
+    jdn = d.toordinal() + _JDN_ORDINAL_OFFSET
+    day_gan_index = (jdn - 11) % 10
+    day_pillar = GAN[day_gan_index] + ZHI[(jdn - 11) % 12]
+
+    midnight = datetime(d.year, d.month, d.day)
+    midnight_s = jieqi_table.to_epoch_seconds(midnight)
+    if JIEQI_TABLE[1] <= midnight_s < JIEQI_TABLE[-1]:
+        # Last term at or before midnight, stepped back to a jie (odd position) if it is a qi
+        position = bisect_right(JIEQI_TABLE, midnight_s) - 1
+        if position % 2 == 0:
+            position -= 1
+        year_pillar, month_pillar = _year_month_for_jie_position(position)
+        next_jie_s = JIEQI_TABLE[position + 2]
+        if next_jie_s < midnight_s + 86400:
+            boundary = jieqi_table.from_epoch_seconds(next_jie_s)
+            year_after, month_after = _year_month_for_jie_position(position + 2)
+        else:
+            boundary, year_after, month_after = None, year_pillar, month_pillar
+        return DayPillars(year_pillar, month_pillar, day_pillar, day_gan_index, boundary, year_after, month_after)
+
+    # Outside the table: scan this year's jie instants from lunar_python
+    instants = jie_instants(d.year)
+    jie_index = -1
+    boundary = None
+    for i, instant in enumerate(instants):
+        if instant <= midnight:
+            jie_index = i
+        elif instant.date() == d:
+            boundary = instant
+            break
+        else:
+            break
+
+    year_pillar, month_pillar = _year_month_after_jie(d.year, jie_index)
+    if boundary is None:
+        year_after, month_after = year_pillar, month_pillar
+    else:
+        year_after, month_after = _year_month_after_jie(d.year, jie_index + 1)
+    return DayPillars(year_pillar, month_pillar, day_pillar, day_gan_index, boundary, year_after, month_after)
+
+def hour_pillar(day_gan_index: int, hour: int) -> str:
+    zhi_index = (hour + 1) // 2 % 12
+    if hour == 23:
+        day_gan_index += 1  # late Zi hour: stem follows the next day
+    return GAN[(day_gan_index % 5 * 2 + zhi_index) % 10] + ZHI[zhi_index]
+
+def pillars_from_day(day: DayPillars, dt: datetime):
+    if day.boundary is not None and dt >= day.boundary:
+        year_pillar, month_pillar = day.year_after, day.month_after
+    else:
+        year_pillar, month_pillar = day.year_pillar, day.month_pillar
+    return year_pillar, month_pillar, day.day_pillar, hour_pillar(day.day_gan_index, dt.hour)
+
+def pillars(dt: datetime):
+    # (year_pillar, month_pillar, day_pillar, hour_pillar) for a solar datetime
+    return pillars_from_day(day_pillars(dt.date()), dt)
+
+# ------------------------------
+# Differential check against lunar_python
+#   Random minutes in every year, the minutes around every jie instant, and the
+#   late/early Zi hours around midnight. Returns a list of mismatches.
+# ------------------------------
+def verify_against_lunar(start_year: int = 1901, end_year: int = 2100, samples_per_year: int = 50, seed: int = 0):
+    rng = random.Random(seed)
+    mismatches = []
+
+    def check(dt):
+        eight_char = Solar.fromYmdHms(dt.year, dt.month, dt.day, dt.hour, dt.minute, 0).getLunar().getEightChar()
+        expected = (eight_char.getYear(), eight_char.getMonth(), eight_char.getDay(), eight_char.getTime())
+        actual = pillars(dt)
+        if actual != expected:
+            mismatches.append((dt, actual, expected))
+
+    for year in range(start_year, end_year + 1):
+        year_start = datetime(year, 1, 1)
+        year_minutes = (datetime(year + 1, 1, 1) - year_start) // timedelta(minutes=1)
+        for _ in range(samples_per_year):
+            check(year_start + timedelta(minutes=rng.randrange(year_minutes)))
+        for instant in jie_instants(year):
+            minute = instant.replace(second=0)
+            for delta in (-1, 0, 1):
+                check(minute + timedelta(minutes=delta))
+        day = year_start + timedelta(days=rng.randrange(365))
+        for hour, minute in ((22, 59), (23, 0), (23, 59)):
+            check(day.replace(hour=hour, minute=minute))
+        check(day + timedelta(days=1))
+    return mismatches
+
+if __name__ == "__main__":
+    start, end = (int(sys.argv[1]), int(sys.argv[2])) if len(sys.argv) == 3 else (1901, 2100)
+    found = verify_against_lunar(start, end)
+    for dt, actual, expected in found[:20]:
+        print(f"{dt:%Y-%m-%d %H:%M}  engine={actual}  lunar_python={expected}")
+    print(f"{start}-{end}: {len(found)} mismatches")
+    sys.exit(1 if found else 0)
@@ -0,0 +1,106 @@
+# test_app.py
+#   Run with: python -m pytest
+import asyncio
+import json
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+import app
+
+CHART_QUERY = "/bazi?birth_year=1990&birth_month=5&birth_day=1&birth_hour=8&birth_minute=0"
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(app.app) as client:
+        yield client
+
+@pytest.mark.parametrize("query", [
+    CHART_QUERY.replace("birth_month=5", "birth_month=2").replace("birth_day=1", "birth_day=30"),
+    CHART_QUERY + "&longitude=nan",
+    CHART_QUERY + "&tz_offset=inf",
+])
+def test_get_bazi_rejects_invalid_input_before_if_none_match(client, query):
+    for headers in ({}, {"If-None-Match": "*"}):
+        response = client.get(query, headers=headers)
+        assert response.status_code == 422
+        assert "ETag" not in response.headers and "Cache-Control" not in response.headers
+
+def test_get_bazi_revalidates_with_etag(client):
+    response = client.get(CHART_QUERY)
+    assert response.status_code == 200
+    assert "immutable" not in response.headers["Cache-Control"]
+    revalidated = client.get(CHART_QUERY, headers={"If-None-Match": response.headers["ETag"]})
+    assert revalidated.status_code == 304
+
+NAME_REQUEST = {"birth_year": 1990, "birth_month": 5, "birth_day": 17, "birth_hour": 14, "birth_minute": 30}
+
+def _names(client, **fields):
+    return client.post("/names", json={**NAME_REQUEST, **fields})
+
+def test_names_pages_follow_on_from_each_other(client):
+    everything = _names(client, surname="李", limit=6).json()
+    first = _names(client, surname="李", limit=3).json()
+    second = _names(client, surname="李", limit=3, cursor=first["next_cursor"]).json()
+    assert first["weak_elements"] == ["木"] and first["surname_strokes"] == 7
+    assert len(first["items"]) == 3
+    assert first["items"] + second["items"] == everything["items"]
+
+def test_names_compound_surname(client):
+    response = _names(client, surname="欧阳", limit=3)
+    assert response.status_code == 200
+    page = response.json()
+    assert page["surname_strokes"] == [15, 17]
+    assert len(page["items"]) == 3 and page["next_cursor"]
+
+def test_names_desired_element(client):
+    page = _names(client, surname="李", desired_element="木", limit=3).json()
+    assert page["items"] and all(item["elements"] == ["木"] * len(item["elements"]) for item in page["items"])
+    assert _names(client, surname="李", desired_element="火").status_code == 422
+    assert _names(client, surname="李", desired_element="X").status_code == 422
+
+def test_names_unknown_surname_and_bad_cursor(client):
+    assert _names(client, surname="zz").status_code == 404
+    assert _names(client, surname="李", cursor="!!bad").status_code == 400
+
+# /bazi/stream through httpx.ASGITransport, which hands the app one http.request message
+# per body chunk (TestClient joins the body into a single chunk)
+def _stream(chunks):
+    async def body():
+        for chunk in chunks:
+            yield chunk
+
+    async def post():
+        transport = httpx.ASGITransport(app=app.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            response = await client.post("/bazi/stream?profile=pillars", content=body())
+            return response.status_code, [json.loads(line) for line in response.text.splitlines()]
+
+    return asyncio.run(post())
+
+def _chart_line(day, month=5):
+    return json.dumps({"birth_year": 1990, "birth_month": month, "birth_day": day,
+                       "birth_hour": 8, "birth_minute": 0}).encode()
+
+def test_stream_chunk_boundaries(monkeypatch):
+    monkeypatch.setattr(app, "MAX_NDJSON_LINE_BYTES", 200)
+    line1, line2, line5, line7 = _chart_line(1), _chart_line(2), _chart_line(5), _chart_line(7)
+    too_long = b'{"pad": "' + b"x" * 400 + b'"}'
+    chunks = [
+        line1 + b"\n" + line2[:20],                 # line 2 split across chunks
+        line2[20:] + b"\n\n" + too_long[:150],      # blank line 3; line 4 starts, still under the limit
+        too_long[150:300],                          # line 4 passes the limit: reported once, then skipped
+        too_long[300:350],                          # chunk entirely inside the skipped line
+        too_long[350:] + b"\n" + line5[:10],
+        line5[10:] + b"\n" + _chart_line(6, month=13) + b"\n" + line7,   # line 7 has no trailing newline
+    ]
+    status, records = _stream(chunks)
+    assert status == 200
+    assert [record["line"] for record in records] == [1, 2, 4, 5, 6, 7]
+    assert [("result" in record) for record in records] == [True, True, False, True, False, True]
+    assert records[2]["error"] == "line too long"
+    assert records[3]["result"]["bazi"]["day_pillar"] == app.calculate_bazi(1990, 5, 5, 8, 0)["bazi"]["day_pillar"]
+
+    # The same body in a single chunk gives the same records
+    assert _stream([b"".join(chunks)]) == (status, records)
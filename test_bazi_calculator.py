@@ -0,0 +1,20 @@
+# test_bazi_calculator.py
+#   Run with: python -m pytest
+from bazi_calculator import BaziCalculator, ChartCache, calculate_bazi
+
+def test_mutating_a_cached_chart_does_not_leak_into_later_calls():
+    first = calculate_bazi(1990, 5, 17, 14, 30)
+    expected = calculate_bazi(1990, 5, 17, 14, 30)
+    first["five_elements_scores"]["木"] += 10
+    first["weak_elements"].append("X")
+    first["ranked_elements"][0]["score"] = -1
+    first["classification"]["percentages"]["火"] = 0
+    first["interpretation"]["dominant_element"]["advice"] = ""
+    first["bazi"]["year_pillar"] = "??"
+    assert calculate_bazi(1990, 5, 17, 14, 30) == expected
+
+def test_cached_and_uncached_charts_agree():
+    cached = BaziCalculator(cache=ChartCache())
+    uncached = BaziCalculator()
+    for _ in range(2):
+        assert cached.calculate_bazi(2001, 1, 1, 0, 5) == uncached.calculate_bazi(2001, 1, 1, 0, 5)
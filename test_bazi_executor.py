@@ -0,0 +1,39 @@
+# test_bazi_executor.py
+#   Run with: python -m pytest
+import asyncio
+import os
+import signal
+
+import pytest
+
+from bazi_calculator import calculate_bazi
+from bazi_executor import ChartExecutor, WorkerPoolRestarted
+
+def test_process_pool_recovers_from_a_dead_worker_and_shuts_down_cleanly():
+    async def scenario():
+        executor = ChartExecutor(backend="process", workers=1)
+        await executor.start()
+        expected = await executor.run(calculate_bazi, 1990, 5, 1, 8, 0)
+
+        broken = executor._pool
+        workers = list(broken._processes.values())
+        os.kill(workers[0].pid, signal.SIGKILL)
+        with pytest.raises(WorkerPoolRestarted):
+            await executor.run(calculate_bazi, 1990, 5, 1, 8, 0)
+        await executor._warm_up
+        assert executor._pool is not broken
+        assert await executor.run(calculate_bazi, 1990, 5, 1, 8, 0) == expected
+
+        # Restart immediately followed by shutdown: the re-warm must not leave a pool behind
+        workers = list(executor._pool._processes.values())
+        os.kill(workers[0].pid, signal.SIGKILL)
+        with pytest.raises(WorkerPoolRestarted):
+            await executor.run(calculate_bazi, 1990, 5, 1, 8, 0)
+        await executor.shutdown()
+        await asyncio.sleep(0.1)
+        assert executor._pool is None
+        await executor.start()
+        assert executor._pool is None
+        assert executor.stats()["restarts"] == 2
+
+    asyncio.run(scenario())
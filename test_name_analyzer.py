@@ -0,0 +1,24 @@
+# test_name_analyzer.py
+#   Run with: python -m pytest
+import name_catalog
+from name_analyzer import NameAnalyzer
+
+def _characters(element, strokes):
+    return [{'character': f"{element}{n}{k}", 'num': n, 'element': element} for n in strokes for k in range(2)]
+
+CHARACTER_DATA = {
+    '金': _characters('金', range(1, 25)),
+    '木': _characters('木', range(3, 30, 2)),
+}
+
+def test_pooled_name_search_matches_sequential():
+    analyzer = NameAnalyzer()
+    for surname_strokes in (7, (3, 7)):
+        for desired_element in (None, '金'):
+            sequential = analyzer.calculate_san_cai_wu_ge(CHARACTER_DATA, surname_strokes, desired_element)
+            pooled = analyzer.calculate_san_cai_wu_ge(CHARACTER_DATA, surname_strokes, desired_element, workers=2)
+            assert sequential and pooled == sequential
+
+def test_pooled_catalog_build_matches_sequential():
+    analyzer = NameAnalyzer()
+    assert name_catalog.build_catalog(analyzer, 20, workers=2) == name_catalog.build_catalog(analyzer, 20, workers=1)
@@ -0,0 +1,14 @@
+# test_pillar_engine.py
+#   Differential test of the arithmetic pillar engine against lunar_python. Every year
+#   checks random minutes, the minutes around each jie and the 23:00 day boundary.
+#   Run with: python -m pytest
+from pillar_engine import verify_against_lunar
+
+def test_engine_matches_lunar_python_over_200_years():
+    # 1901-2100: month pillars come from bisecting the jieqi.bin table
+    assert verify_against_lunar(1901, 2100, samples_per_year=10) == []
+
+def test_engine_matches_lunar_python_outside_the_jieqi_table():
+    # Before 1900 and after 2100 the jie instants come from lunar_python itself
+    assert verify_against_lunar(1890, 1901, samples_per_year=10) == []
+    assert verify_against_lunar(2099, 2110, samples_per_year=10) == []